@@ -1,19 +1,60 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
+from typing import Optional
 
 # Load environment variables from .env file
 load_dotenv()
 class Settings(BaseSettings):
     MONGODB_URL: str
     DB_NAME: str
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 10000
+    MONGODB_COMPRESSORS: str = ""  # e.g. "zstd,snappy,zlib"
+    MONGODB_READ_PREFERENCE: str = "primary"
     AWS_ACCESS_KEY_ID: str
     AWS_SECRET_ACCESS_KEY: str
     AWS_DEFAULT_REGION: str
     S3_BUCKET_NAME: str
+    AWS_S3_ENDPOINT_URL: Optional[str] = None  # e.g. a local MinIO for benchmarks
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" or "mongo" (limits and failed-login cache shared across workers)
+    LOGIN_RATE_LIMIT_PER_USERNAME: int = 5
+    LOGIN_RATE_LIMIT_PER_IP: int = 20
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    FAILED_LOGIN_CACHE_SECONDS: int = 60
+    TRACE_SAMPLE_RATE: float = 0.0  # fraction of requests exported as Chrome trace files
+    TRACE_EXPORT_DIR: str = "traces"
+    DEBUG_ARTIFACTS_ENABLED: bool = False  # write sampled annotated images to DEBUG_ARTIFACTS_DIR
+    DEBUG_ARTIFACTS_DIR: str = "debug_artifacts"
+    DEBUG_ARTIFACTS_SAMPLE_RATE: float = 1.0  # fraction of requests whose artifacts are kept
+    DEBUG_ARTIFACTS_MAX_REQUESTS: int = 100  # newest request directories kept
+    MODEL_RUNTIME: str = "pytorch"  # "pytorch", "onnx" (ONNX Runtime) or "openvino"
+    MODEL_EXPORT_DIR: str = "api/artifacts/exported"
+    MODEL_IMGSZ: int = 640
+    MODEL_INT8: bool = False  # quantize exported models (dynamic for ONNX, calibrated for OpenVINO)
+    MODEL_CALIBRATION_DATA: Optional[str] = None  # dataset yaml for OpenVINO INT8 calibration
+    SEGMENTATION_BOX_ONLY: bool = True  # read only the best box from the pipe segmentation model, skipping NMS and masks
+    COUNT_LITE_SERVICES: str = ""  # comma-separated services that skip rendering unless a request asks for it
+    PROCESSED_IMAGE_FORMAT: str = "jpeg"  # annotated image encoding: "jpeg", "webp" or "png"
+    PROCESSED_IMAGE_QUALITY: int = 85  # JPEG/WebP quality, 1-100
+    PROCESSED_IMAGE_MAX_SIDE: int = 0  # downscale annotated images to this longer side; 0 keeps them as drawn
+    RESULT_CACHE_TTL_SECONDS: int = 24 * 3600  # reuse results for resubmitted images this long; 0 disables
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600  # how long responses are replayed for a reused Idempotency-Key
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0  # how long a replay waits for the original request to finish
+    IDEMPOTENCY_LOCK_SECONDS: int = 300  # in-progress keys are released after this if their worker dies
+    IDEMPOTENCY_MAX_BODY_BYTES: int = 1024 * 1024  # larger responses are not stored
+    IDEMPOTENCY_LOCAL_CACHE_SIZE: int = 1024  # completed responses cached per worker
+    ROI_CACHE_SECONDS: int = 60  # saved ROIs cached per user and worker; other workers see changes after this
+    ROI_CACHE_SIZE: int = 10000  # users whose saved ROIs are cached per worker
+    RENDER_MAX_SIDE: int = 1920  # longest side of images rendered on demand from stored detections
+    RENDER_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # in-process LRU of rendered images, per worker
+    YOLOV5_REPO_DIR: Optional[str] = None  # local ultralytics/yolov5 checkout (set in the docker image); defaults to the torch.hub cache
     RAZORPAY_API_KEY: str
     RAZORPAY_SECRET_KEY: str
     TEST_RAZORPAY_API_KEY: str
@@ -3,6 +3,7 @@
 import boto3
 import os
 import logging
+from urllib.parse import urlparse
 from botocore.exceptions import NoCredentialsError
 from api.config import settings
 
@@ -19,6 +20,13 @@ class AWSConfig:
         )
         self.logger.info("AWS session initialized")
 
+    def _object_url(self, s3_client, bucket_name, object_name):
+        if settings.AWS_S3_ENDPOINT_URL:
+            # S3-compatible stand-in (e.g. MinIO): path-style URL on the configured endpoint
+            return f"{settings.AWS_S3_ENDPOINT_URL.rstrip('/')}/{bucket_name}/{object_name}"
+        location = s3_client.get_bucket_location(Bucket=bucket_name)['LocationConstraint']
+        return f"https://{bucket_name}.s3.{location}.amazonaws.com/{object_name}"
+
     def upload_to_s3(self, file_name, bucket_name, object_name=None):
         """
         Upload a file to an S3 bucket directly using session client.
@@ -32,11 +40,35 @@ class AWSConfig:
             object_name = file_name
 
         self.logger.info(f"Uploading {file_name} to bucket {bucket_name}")
-        s3_client = self.session.client('s3')
+        s3_client = self.session.client('s3', endpoint_url=settings.AWS_S3_ENDPOINT_URL)
         try:
             s3_client.upload_file(file_name, bucket_name, object_name)
-            location = s3_client.get_bucket_location(Bucket=bucket_name)['LocationConstraint']
-            url = f"https://{bucket_name}.s3.{location}.amazonaws.com/{object_name}"
+            url = self._object_url(s3_client, bucket_name, object_name)
+            self.logger.info(f"File uploaded successfully to {url}")
+            return url
+        except NoCredentialsError:
+            self.logger.error("Credentials not available for AWS S3")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error uploading file to S3: {e}")
+            return None
+
+    def upload_bytes_to_s3(self, data, bucket_name, object_name, content_type=None):
+        """
+        Upload in-memory bytes to an S3 bucket, without going through a local file.
+
+        :param data: Bytes to upload
+        :param bucket_name: Bucket to upload to
+        :param object_name: S3 object name
+        :param content_type: Content-Type stored with the object
+        :return: URL of the uploaded object if successful, else None
+        """
+        self.logger.info(f"Uploading {len(data)} bytes to {object_name} in bucket {bucket_name}")
+        s3_client = self.session.client('s3', endpoint_url=settings.AWS_S3_ENDPOINT_URL)
+        extra_args = {"ContentType": content_type} if content_type else {}
+        try:
+            s3_client.put_object(Bucket=bucket_name, Key=object_name, Body=data, **extra_args)
+            url = self._object_url(s3_client, bucket_name, object_name)
             self.logger.info(f"File uploaded successfully to {url}")
             return url
         except NoCredentialsError:
@@ -45,3 +77,26 @@ class AWSConfig:
         except Exception as e:
             self.logger.error(f"Error uploading file to S3: {e}")
             return None
+
+    def download_from_s3(self, url, bucket_name):
+        """
+        Download an object uploaded with upload_to_s3, given the URL it returned.
+
+        :param url: URL returned by upload_to_s3
+        :param bucket_name: Bucket the object was uploaded to
+        :return: The object's bytes if successful, else None
+        """
+        object_name = urlparse(url).path.lstrip("/")
+        if settings.AWS_S3_ENDPOINT_URL:
+            # Path-style URL: the bucket is the first path segment
+            object_name = object_name[len(bucket_name) + 1:]
+
+        s3_client = self.session.client('s3', endpoint_url=settings.AWS_S3_ENDPOINT_URL)
+        try:
+            return s3_client.get_object(Bucket=bucket_name, Key=object_name)["Body"].read()
+        except NoCredentialsError:
+            self.logger.error("Credentials not available for AWS S3")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error downloading {object_name} from S3: {e}")
+            return None
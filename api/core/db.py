@@ -1,9 +1,180 @@
+import asyncio
+import logging
+import threading
+import time
 import motor.motor_asyncio
+from pymongo import monitoring
+from pymongo.errors import OperationFailure
 
 from api.config import settings
+from api.core.metrics import Gauge
 
-# connect to mongodb
-client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URL)
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Tracks connection pool utilisation from pymongo's CMAP events.
+
+    Events are published from pymongo's worker threads, so counters are updated under a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_seconds = 0.0
+        self.pool_clears = 0
+        self._wait_started = {}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+                "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_checkout_wait_ms": (
+                    self.checkout_wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0
+                ),
+                "pool_clears": self.pool_clears,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+            self._wait_started[threading.get_ident()] = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+            self._wait_started.pop(threading.get_ident(), None)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            started = self._wait_started.pop(threading.get_ident(), None)
+            if started is not None:
+                self.checkout_wait_seconds += time.perf_counter() - started
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+
+pool_stats = PoolStatsListener()
+
+# Export the pool counters on /metrics; values are read from the listener at scrape time
+for _field, _documentation in (
+    ("open_connections", "Open connections in the MongoDB pool"),
+    ("checked_out", "MongoDB connections currently checked out"),
+    ("waiting", "Operations waiting for a MongoDB connection"),
+    ("checkouts", "Total MongoDB connection checkouts"),
+    ("checkout_failures", "MongoDB connection checkouts that failed or timed out"),
+):
+    Gauge(f"mongo_pool_{_field}", _documentation).set_function(
+        lambda field=_field: getattr(pool_stats, field)
+    )
+Gauge("mongo_pool_max_size", "Configured MongoDB maxPoolSize").set(settings.MONGODB_MAX_POOL_SIZE)
+
+client_options = {
+    "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+    "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+    "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+    "readPreference": settings.MONGODB_READ_PREFERENCE,
+    "event_listeners": [pool_stats],
+}
+if settings.MONGODB_COMPRESSORS:
+    client_options["compressors"] = settings.MONGODB_COMPRESSORS
+
+# connect to mongodb; the client connects lazily and is opened/closed by the app lifespan
+client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URL, **client_options)
 
 # create the news_summary_users database
-db = client[settings.DB_NAME]
\ No newline at end of file
+db = client[settings.DB_NAME]
+
+
+async def ensure_indexes():
+    """
+    Create the indexes the application relies on for correctness. Safe to run on every startup.
+    """
+    try:
+        # Registration relies on these to reject duplicate users in a single insert
+        await db["users"].create_index("name", unique=True, name="unique_name")
+        await db["users"].create_index("email", unique=True, name="unique_email")
+    except OperationFailure as e:
+        # Most likely existing duplicate users; registration stays unprotected until they are cleaned up
+        logger.error(f"Failed to create unique user indexes: {e}")
+
+    # One saved ROI per user and camera; looked up on every count request
+    await db["rois"].create_index([("user_id", 1), ("camera_id", 1)], unique=True, name="unique_user_camera")
+
+
+async def ping_db() -> float:
+    """
+    Round trip a ping to the server and return its latency in milliseconds.
+    """
+    started = time.perf_counter()
+    await client.admin.command("ping")
+    return (time.perf_counter() - started) * 1000
+
+
+async def connect_db():
+    """
+    Verify the database is reachable, warm the connection pool and create indexes. Called on app startup.
+    """
+    latency_ms = await ping_db()
+    logger.info(f"Connected to MongoDB in {latency_ms:.1f} ms")
+
+    # Warm-up round trips on the application database, concurrently so the pool opens minPoolSize
+    # connections (at least one) before traffic arrives
+    warm_connections = max(settings.MONGODB_MIN_POOL_SIZE, 1)
+    await asyncio.gather(*(db.command("ping") for _ in range(warm_connections)))
+    logger.info(f"Warmed MongoDB pool: {pool_stats.snapshot()['open_connections']} connections open")
+
+    await ensure_indexes()
+
+
+def close_db():
+    """
+    Close all pooled connections. Called on app shutdown.
+    """
+    client.close()
+    logger.info("MongoDB connection closed")
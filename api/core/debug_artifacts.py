@@ -0,0 +1,85 @@
+"""
+Optional on-disk copies of intermediate and annotated images, for debugging the count services.
+
+Off by default. When DEBUG_ARTIFACTS_ENABLED is set, a DEBUG_ARTIFACTS_SAMPLE_RATE fraction of
+requests get a directory under DEBUG_ARTIFACTS_DIR, named after the request's trace id, and the
+images passed to save_debug_artifact are written there as JPEGs. Encoding and writing happen on a
+background thread, so the request never waits on disk; if the writer falls behind, artifacts are
+dropped rather than queued without bound. Only the newest DEBUG_ARTIFACTS_MAX_REQUESTS request
+directories are kept.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from api.config import settings
+from api.core.tracing import current_trace
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Artifacts waiting to be written; beyond this they are dropped
+MAX_PENDING_ARTIFACTS = 16
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-artifacts")
+_pending = threading.BoundedSemaphore(MAX_PENDING_ARTIFACTS)
+
+
+def _request_directory():
+    """
+    (directory name, sampling key) for the current request. Outside a traced request every call
+    counts as its own request.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        request_id = uuid.uuid4().hex
+        return f"{int(time.time() * 1000)}_{request_id}", request_id
+    return f"{int(trace.wall_started * 1000)}_{trace.trace_id}", trace.trace_id
+
+
+def _sampled(request_id: str) -> bool:
+    # Hash rather than random() so every artifact of one request gets the same decision
+    return zlib.crc32(request_id.encode()) / 2 ** 32 < settings.DEBUG_ARTIFACTS_SAMPLE_RATE
+
+
+def _prune():
+    entries = sorted(os.listdir(settings.DEBUG_ARTIFACTS_DIR))
+    for entry in entries[:max(len(entries) - settings.DEBUG_ARTIFACTS_MAX_REQUESTS, 0)]:
+        shutil.rmtree(os.path.join(settings.DEBUG_ARTIFACTS_DIR, entry), ignore_errors=True)
+
+
+def _write(directory: str, name: str, image):
+    try:
+        path = os.path.join(settings.DEBUG_ARTIFACTS_DIR, directory)
+        os.makedirs(path, exist_ok=True)
+        cv2.imwrite(os.path.join(path, f"{name}.jpg"), image)
+        _prune()
+    except Exception as e:
+        logger.error(f"Failed to write debug artifact {name}: {e}")
+    finally:
+        _pending.release()
+
+
+def save_debug_artifact(name: str, image) -> bool:
+    """
+    Queue a BGR image to be written as `<request directory>/<name>.jpg`. Returns whether it was
+    queued; a no-op unless debug artifacts are enabled and the current request is sampled.
+    """
+    if not settings.DEBUG_ARTIFACTS_ENABLED:
+        return False
+    directory, request_id = _request_directory()
+    if not _sampled(request_id):
+        return False
+    if not _pending.acquire(blocking=False):
+        logger.warning(f"Debug artifact writer is backed up, dropping {name}")
+        return False
+    # Copy, since the caller may keep drawing on the image after this returns
+    _writer.submit(_write, directory, name, image.copy())
+    return True
@@ -0,0 +1,247 @@
+"""
+Idempotency keys for state-changing requests.
+
+A client that may retry a POST (a count upload on a flaky network, a subscription that creates a
+Razorpay subscription) sends an `Idempotency-Key` header. The first request with a given key runs
+normally and its response is stored; a replay gets the stored response, with an
+`Idempotent-Replayed: true` header, instead of running the endpoint again. A replay that arrives
+while the first request is still running waits for it, up to IDEMPOTENCY_WAIT_SECONDS.
+
+Keys are scoped to the caller's Authorization header, method and path, and bound to the request
+body: reusing a key with a different body is rejected. Responses are kept for
+IDEMPOTENCY_TTL_SECONDS in a TTL-indexed MongoDB collection shared by all workers, with an
+in-process cache in front of it. Server errors are not stored, so the client can retry them.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from api.config import settings
+from api.core.db import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# How often a replay checks whether the original request, running in another worker, has finished
+POLL_INTERVAL = 0.25
+
+collection = db["idempotency_keys"]
+_indexes_ready = False
+
+# Completed responses by scoped key: (expires at, response); bounded, oldest evicted first
+_completed = OrderedDict()
+# Requests running in this worker by scoped key
+_in_flight = {}
+
+
+async def _ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    await collection.create_index("expires_at", expireAfterSeconds=0)
+    _indexes_ready = True
+
+
+def _cache_response(key: str, response: dict):
+    _completed[key] = (time.monotonic() + settings.IDEMPOTENCY_TTL_SECONDS, response)
+    _completed.move_to_end(key)
+    while len(_completed) > settings.IDEMPOTENCY_LOCAL_CACHE_SIZE:
+        _completed.popitem(last=False)
+
+
+def _cached_response(key: str):
+    entry = _completed.get(key)
+    if entry is None:
+        return None
+    expires_at, response = entry
+    if expires_at <= time.monotonic():
+        _completed.pop(key, None)
+        return None
+    return response
+
+
+async def _send_stored(send, response: dict):
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response["headers"]]
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": response["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": response["body"]})
+
+
+async def _send_error(send, status: int, detail: str, headers=()):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware that replays the stored response for requests carrying an already-used
+    Idempotency-Key, instead of running the endpoint again.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key", b"").decode("latin-1")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_error(send, 400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+            return
+
+        # Read the whole body to fingerprint it, then hand it to the app unchanged
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        caller = hashlib.sha256(headers.get(b"authorization", b"")).hexdigest()[:16]
+        key = hashlib.sha256(
+            f"{caller}:{scope['method']}:{scope['path']}:{idempotency_key}".encode()
+        ).hexdigest()
+
+        response = await self._acquire(key, fingerprint, send)
+        if response is not None:
+            # Replay: the stored response, or an error that has already been sent
+            if response is not True:
+                await _send_stored(send, response)
+            return
+
+        done = _in_flight[key] = asyncio.Event()
+        try:
+            await self._run(scope, body, send, key, fingerprint)
+        finally:
+            done.set()
+            _in_flight.pop(key, None)
+
+    async def _acquire(self, key: str, fingerprint: str, send):
+        """
+        Claim `key` for this request. Returns None if this request should run, a stored response to
+        replay, or True if an error response has already been sent.
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        await _ensure_indexes()
+        while True:
+            response = _cached_response(key)
+            if response is not None:
+                if response["fingerprint"] != fingerprint:
+                    await _send_error(send, 422, "Idempotency-Key was already used with a different request body")
+                    return True
+                return response
+
+            running = _in_flight.get(key)
+            if running is not None:
+                # Same worker: wait for the original request rather than polling the database
+                try:
+                    await asyncio.wait_for(running.wait(), max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    pass
+
+            now = datetime.now(timezone.utc)
+            try:
+                await collection.insert_one({
+                    "_id": key,
+                    "status": "in_progress",
+                    "fingerprint": fingerprint,
+                    # Released if the worker dies mid-request
+                    "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                })
+                return None
+            except DuplicateKeyError:
+                entry = await collection.find_one({"_id": key})
+
+            if entry is None:
+                continue  # expired or released between the insert and the read
+            if entry["fingerprint"] != fingerprint:
+                await _send_error(send, 422, "Idempotency-Key was already used with a different request body")
+                return True
+            if entry["status"] == "completed":
+                response = {**entry["response"], "fingerprint": fingerprint}
+                _cache_response(key, response)
+                return response
+            if entry["expires_at"].replace(tzinfo=timezone.utc) <= now:
+                # The original request's worker went away; take the key over
+                await collection.delete_one({"_id": key, "status": "in_progress", "expires_at": entry["expires_at"]})
+                continue
+            if time.monotonic() >= deadline:
+                await _send_error(
+                    send, 409, "A request with this Idempotency-Key is still in progress",
+                    headers=[(b"retry-after", b"1")],
+                )
+                return True
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _run(self, scope, body: bytes, send, key: str, fingerprint: str):
+        """
+        Run the request and store its response under `key`, or release the key if it can't be kept.
+        """
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if body_sent:
+                # Block like a live connection would until the response is done
+                await asyncio.Event().wait()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        started = {}
+        response_chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                started.update(message)
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        except BaseException:
+            await collection.delete_one({"_id": key, "status": "in_progress"})
+            raise
+
+        response_body = b"".join(response_chunks)
+        status = started.get("status", 500)
+        if status >= 500 or len(response_body) > settings.IDEMPOTENCY_MAX_BODY_BYTES:
+            # Let the client retry server errors; responses too large to keep are not replayable
+            await collection.delete_one({"_id": key, "status": "in_progress"})
+            return
+
+        response = {
+            "status": status,
+            "headers": [(name.decode("latin-1"), value.decode("latin-1")) for name, value in started.get("headers", [])],
+            "body": response_body,
+        }
+        await collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "status": "completed",
+                "response": response,
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+            }},
+        )
+        _cache_response(key, {**response, "fingerprint": fingerprint})
@@ -0,0 +1,344 @@
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from api.core.tracing import span
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond handlers up to slow inference calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every metric created with register=True is exported by render_prometheus()
+REGISTRY = []
+
+# Updates below take no locks: they are single attribute/list-item increments that run under the GIL,
+# and an occasional lost increment under heavy thread contention is acceptable for monitoring.
+
+
+class _Metric:
+    """
+    Base for metrics with optional labels. A labelled metric holds one child per label value combination.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str = "", labelnames=(), register: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if register:
+            REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self):
+        """
+        Yield (label dict, child) pairs; an unlabelled metric is its own single child.
+        """
+        if not self.labelnames:
+            yield {}, self
+            return
+        for key, child in list(self._children.items()):
+            yield dict(zip(self.labelnames, key)), child
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str = "", labelnames=(), register: bool = True):
+        super().__init__(name, documentation, labelnames, register)
+        self.value = 0
+
+    def _new_child(self):
+        return Counter(self.name, register=False)
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str = "", labelnames=(), register: bool = True):
+        super().__init__(name, documentation, labelnames, register)
+        self._value = 0
+        self._function = None
+
+    def _new_child(self):
+        return Gauge(self.name, register=False)
+
+    @property
+    def value(self):
+        return self._function() if self._function else self._value
+
+    def set(self, value: float):
+        self._value = value
+
+    def set_function(self, function):
+        """
+        Read the value from `function` at collection time instead of storing it.
+        """
+        self._function = function
+
+    def inc(self, amount: float = 1):
+        self._value += amount
+
+    def dec(self, amount: float = 1):
+        self._value -= amount
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str = "", labelnames=(), buckets=DEFAULT_BUCKETS, register: bool = True):
+        super().__init__(name, documentation, labelnames, register)
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket plus the +Inf overflow slot; counts are per bucket, not cumulative
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self):
+        return Histogram(self.name, buckets=self.buckets, register=False)
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket containing it.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return "NaN"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def render_prometheus() -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        for labels, child in metric.samples():
+            if isinstance(child, Histogram):
+                cumulative = 0
+                for bound, bucket_count in zip(child.buckets + (float("inf"),), child.bucket_counts):
+                    cumulative += bucket_count
+                    bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                    lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {child.count}")
+            else:
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(child.value)}")
+    return "\n".join(lines) + "\n"
+
+
+class ProcessSampler:
+    """
+    Background thread that periodically reads system CPU, process CPU and RSS from /proc.
+
+    Readers get the latest sample from `latest` without doing any I/O themselves.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.latest = {"cpu_percent": None, "process_cpu_percent": None, "rss_bytes": None, "sampled_at": None}
+        self._stop = threading.Event()
+        self._thread = None
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self._clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._last_system = None
+        self._last_process = None
+
+    @staticmethod
+    def _read_system_cpu():
+        with open("/proc/stat") as f:
+            fields = [int(value) for value in f.readline().split()[1:]]
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+        return sum(fields), idle
+
+    def _read_process(self):
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesised command name; utime and stime are fields 14 and 15
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / self._clock_ticks
+        with open("/proc/self/statm") as f:
+            rss_pages = int(f.read().split()[1])
+        return cpu_seconds, rss_pages * self._page_size
+
+    def sample(self):
+        now = time.monotonic()
+        try:
+            total, idle = self._read_system_cpu()
+            cpu_seconds, rss_bytes = self._read_process()
+        except (OSError, ValueError, IndexError):
+            # No procfs (e.g. local development on Windows/macOS)
+            return self.latest
+
+        sample = {"cpu_percent": None, "process_cpu_percent": None, "rss_bytes": rss_bytes, "sampled_at": time.time()}
+        if self._last_system:
+            last_total, last_idle = self._last_system
+            if total > last_total:
+                sample["cpu_percent"] = round(100.0 * (1 - (idle - last_idle) / (total - last_total)), 1)
+        if self._last_process:
+            last_cpu_seconds, last_time = self._last_process
+            if now > last_time:
+                sample["process_cpu_percent"] = round(100.0 * (cpu_seconds - last_cpu_seconds) / (now - last_time), 1)
+
+        self._last_system = (total, idle)
+        self._last_process = (cpu_seconds, now)
+        self.latest = sample
+        return sample
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+
+process_sampler = ProcessSampler()
+
+process_cpu_percent = Gauge("process_cpu_percent", "Worker process CPU usage sampled from /proc")
+process_cpu_percent.set_function(lambda: process_sampler.latest["process_cpu_percent"])
+system_cpu_percent = Gauge("system_cpu_percent", "System-wide CPU usage sampled from /proc")
+system_cpu_percent.set_function(lambda: process_sampler.latest["cpu_percent"])
+process_resident_memory_bytes = Gauge("process_resident_memory_bytes", "Worker process RSS sampled from /proc")
+process_resident_memory_bytes.set_function(lambda: process_sampler.latest["rss_bytes"])
+
+
+# Count pipeline instrumentation, shared by every counting service
+COUNT_STAGES = (
+    "model_load", "decode", "segmentation_predict", "counting_predict", "postprocess",
+    "annotate", "encode", "s3_upload", "s3_download", "mongo_insert",
+)
+count_stage_seconds = Histogram(
+    "count_stage_seconds", "Time spent in each stage of the count pipeline", labelnames=("service", "stage")
+)
+count_requests_total = Counter("count_requests_total", "Count requests received", labelnames=("service",))
+count_failures_total = Counter("count_failures_total", "Count requests that raised", labelnames=("service",))
+inference_queue_depth = Gauge(
+    "inference_queue_depth", "Count requests waiting for or running model inference"
+)
+
+current_service = contextvars.ContextVar("current_service", default="unknown")
+
+
+@contextmanager
+def count_service(service: str):
+    """
+    Mark the enclosed block as a count request for `service`; stage timings inside it are labelled with it.
+    """
+    token = current_service.set(service)
+    count_requests_total.labels(service=service).inc()
+    try:
+        yield
+    except BaseException:
+        count_failures_total.labels(service=service).inc()
+        raise
+    finally:
+        current_service.reset(token)
+
+
+def instrument_count(service: str):
+    """
+    Decorator for count endpoints: runs the endpoint inside `count_service(service)`.
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            with count_service(service):
+                return await endpoint(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Time the enclosed block as `stage` of the current count request, and record it as a trace span.
+    """
+    started = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    finally:
+        count_stage_seconds.labels(service=current_service.get(), stage=stage).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def inference_slot():
+    """
+    Count the enclosed block towards the inference queue depth.
+    """
+    inference_queue_depth.inc()
+    try:
+        yield
+    finally:
+        inference_queue_depth.dec()
@@ -11,6 +11,7 @@ import logging
 # module imports
 from api.core.db import db
 from api.models.user import TokenData
+from api.core.tracing import traced
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
@@ -70,6 +71,7 @@ async def verify_access_token(token: str) -> TokenData:
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+@traced("get_current_user")
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     token_data = await verify_access_token(token)
     user = await db["users"].find_one({"_id": token_data.id})
@@ -0,0 +1,214 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from starlette.routing import Match
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Only one CPU profile may run at a time per worker
+_cpu_profile_lock = threading.Lock()
+_last_allocation_snapshot = None
+
+# While a CPU profile runs, requests are tagged with their route ("METHOD /path/{param}"): the
+# request's task on the event loop, and worker threads while they run `attributed` work for it
+current_route = contextvars.ContextVar("current_route", default=None)
+_task_routes = {}
+_thread_routes = {}
+# Event loop of each thread that has served a tagged request
+_loop_threads = {}
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def route_label(scope) -> str:
+    """
+    "METHOD /path" of the route that serves an ASGI request, with the route's path template.
+    """
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return f"{scope['method']} {route.path}"
+    return f"{scope['method']} <unmatched>"
+
+
+class RouteAttributionMiddleware:
+    """
+    ASGI middleware that tags each request with its route while a CPU profile is running, so the
+    sampler can attribute event loop samples to the request whose task is running. Does nothing
+    otherwise; requests already in flight when a profile starts stay untagged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _cpu_profile_lock.locked():
+            await self.app(scope, receive, send)
+            return
+
+        route = route_label(scope)
+        task = asyncio.current_task()
+        _loop_threads[threading.get_ident()] = asyncio.get_running_loop()
+        _task_routes[task] = route
+        token = current_route.set(route)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
+            _task_routes.pop(task, None)
+
+
+def attributed(func):
+    """
+    Wrap `func`, before it's handed to a worker thread, so CPU profile samples taken while it runs
+    are attributed to the calling request's route. Returns `func` itself when no profile is running.
+    """
+    route = current_route.get()
+    if route is None:
+        return func
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        thread_id = threading.get_ident()
+        _thread_routes[thread_id] = route
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _thread_routes.pop(thread_id, None)
+
+    return run
+
+
+def _sample_route(thread_id):
+    """
+    The route a thread is working for right now, from the request tags; None if it isn't tagged.
+    """
+    route = _thread_routes.get(thread_id)
+    if route is not None:
+        return route
+    loop = _loop_threads.get(thread_id)
+    if loop is not None:
+        return _task_routes.get(asyncio.current_task(loop))
+    return None
+
+
+def build_route_map(app) -> dict:
+    """
+    Map each endpoint's code object to "METHODS /path", so samples of untagged requests (e.g. sync
+    endpoints on the threadpool) can still be attributed to routes. Decorated endpoints are
+    unwrapped so their own code object is used.
+    """
+    route_map = {}
+    for route in app.routes:
+        endpoint = getattr(route, "endpoint", None)
+        if endpoint is None:
+            continue
+        code = getattr(inspect.unwrap(endpoint), "__code__", None)
+        if code is not None:
+            methods = ",".join(sorted(getattr(route, "methods", None) or []))
+            route_map[code] = f"{methods} {route.path}".strip()
+    return route_map
+
+
+def _frame_label(code) -> str:
+    # ';' separates frames in the folded format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def profile_cpu(seconds: float, interval: float = 0.005, route_map: dict = None) -> str:
+    """
+    Sample the Python stacks of every other thread for `seconds`, blocking the calling thread.
+
+    :return: Collapsed stacks ("route;thread;frame;...;frame count" per line), the format read by
+             flamegraph.pl and speedscope. Samples are grouped under the route the thread is tagged
+             with (RouteAttributionMiddleware, attributed), else the route whose endpoint is on the
+             stack, or "<unattributed>" (e.g. idle event loop time).
+    """
+    if not _cpu_profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A CPU profile is already running")
+
+    route_map = route_map or {}
+    own_thread = threading.get_ident()
+    samples = Counter()
+    try:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                route = "<unattributed>"
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    if frame.f_code in route_map:
+                        route = route_map[frame.f_code]
+                    frame = frame.f_back
+                route = _sample_route(thread_id) or route
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                stack.append(route)
+                samples[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+    finally:
+        _cpu_profile_lock.release()
+
+    logger.info(f"CPU profile finished: {sum(samples.values())} samples over {seconds}s")
+    return "\n".join(f"{stack} {count}" for stack, count in samples.most_common()) + "\n"
+
+
+def start_allocation_tracing(frames: int = 25):
+    global _last_allocation_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        _last_allocation_snapshot = None
+        logger.info(f"Allocation tracing started with {frames} frames")
+
+
+def stop_allocation_tracing():
+    global _last_allocation_snapshot
+    tracemalloc.stop()
+    _last_allocation_snapshot = None
+    logger.info("Allocation tracing stopped")
+
+
+def allocation_report(limit: int = 50, compare: bool = False) -> str:
+    """
+    Top allocation sites by size, or by growth since the previous report when `compare` is set.
+    """
+    global _last_allocation_snapshot
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("Allocation tracing is not running")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"# traced current={current} bytes peak={peak} bytes"]
+
+    if compare and _last_allocation_snapshot is not None:
+        stats = snapshot.compare_to(_last_allocation_snapshot, "traceback")[:limit]
+        lines.append(f"# top {limit} allocation sites by growth since the previous report")
+    else:
+        stats = snapshot.statistics("traceback")[:limit]
+        lines.append(f"# top {limit} allocation sites by size")
+
+    for stat in stats:
+        lines.append("")
+        lines.append(str(stat))
+        lines.extend(f"    {line}" for line in stat.traceback.format())
+
+    _last_allocation_snapshot = snapshot
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,241 @@
+import hashlib
+import hmac
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ASCENDING
+
+from api.config import settings
+from api.core.db import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Keys tracked by the in-process backend before expired windows are swept
+MAX_TRACKED_KEYS = 10000
+
+
+class InMemoryRateLimitBackend:
+    """
+    Sliding-window hit log kept in the worker process. Cheap, but each worker counts separately.
+    """
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self.max_keys = max_keys
+        self._hits = {}
+
+    def _sweep(self, now: float, window: float):
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= now - window]:
+            del self._hits[key]
+        # Still too many live keys: drop the oldest ones rather than grow without bound
+        while len(self._hits) > self.max_keys:
+            del self._hits[next(iter(self._hits))]
+
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        now = time.monotonic()
+        hits = self._hits.get(key)
+        if hits is None:
+            if len(self._hits) >= self.max_keys:
+                self._sweep(now, window)
+            hits = self._hits[key] = deque()
+
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+
+        if len(hits) >= limit:
+            return hits[0] + window - now
+
+        hits.append(now)
+        return None
+
+    async def reset(self, key: str):
+        self._hits.pop(key, None)
+
+
+class MongoRateLimitBackend:
+    """
+    Sliding-window hit log shared by all workers through a TTL-indexed MongoDB collection.
+    """
+
+    def __init__(self, collection_name: str = "rate_limits"):
+        self.collection = db[collection_name]
+        self._indexes_ready = False
+
+    async def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        await self.collection.create_index([("key", ASCENDING), ("created_at", ASCENDING)])
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self._indexes_ready = True
+
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        await self._ensure_indexes()
+        now = datetime.now(timezone.utc)
+        window_start = now - timedelta(seconds=window)
+
+        oldest = await self.collection.find(
+            {"key": key, "created_at": {"$gt": window_start}},
+            {"created_at": 1},
+        ).sort("created_at", ASCENDING).limit(limit).to_list(length=limit)
+
+        if len(oldest) >= limit:
+            oldest_hit = oldest[0]["created_at"].replace(tzinfo=timezone.utc)
+            return max((oldest_hit - window_start).total_seconds(), 0.0)
+
+        await self.collection.insert_one(
+            {"key": key, "created_at": now, "expires_at": now + timedelta(seconds=window)}
+        )
+        return None
+
+    async def reset(self, key: str):
+        await self.collection.delete_many({"key": key})
+
+
+def get_rate_limit_backend():
+    if settings.RATE_LIMIT_BACKEND == "mongo":
+        return MongoRateLimitBackend()
+    return InMemoryRateLimitBackend()
+
+
+class SlidingWindowRateLimiter:
+    """
+    Allow at most `limit` hits per key within any `window` seconds.
+    """
+
+    def __init__(self, name: str, limit: int, window: float, backend=None):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.backend = backend or get_rate_limit_backend()
+
+    async def hit(self, key: str) -> Optional[float]:
+        """
+        Record a hit for `key`.
+
+        :return: None if the hit is allowed, otherwise the number of seconds until it would be.
+        """
+        if self.limit <= 0:
+            return None
+        retry_after = await self.backend.hit(f"{self.name}:{key}", self.limit, self.window)
+        if retry_after is not None:
+            logger.warning(f"Rate limit {self.name} exceeded for {key}")
+        return retry_after
+
+    async def reset(self, key: str):
+        await self.backend.reset(f"{self.name}:{key}")
+
+
+def _credential_digest(*parts: str) -> str:
+    message = "\0".join(parts).encode("utf-8")
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+class FailedCredentialCache:
+    """
+    Short-lived cache of credential pairs that recently failed verification, kept in the worker process.
+
+    Repeating a known-bad pair is rejected without a database query or a bcrypt verify.
+    Pairs are stored as keyed HMAC digests, never in plain text. Usernames are used exactly as the
+    login looks them up, so a pair is only cached for the account it was checked against.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = MAX_TRACKED_KEYS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+
+    async def contains(self, username: str, password: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        digests = self._entries.get(username)
+        if not digests:
+            return False
+        digest = _credential_digest(username, password)
+        expires_at = digests.get(digest)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del digests[digest]
+            return False
+        return True
+
+    async def add(self, username: str, password: str):
+        if self.ttl <= 0:
+            return
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            for key in [k for k, digests in self._entries.items() if max(digests.values(), default=0) <= now]:
+                del self._entries[key]
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        self._entries.setdefault(username, {})[_credential_digest(username, password)] = time.monotonic() + self.ttl
+
+    async def invalidate(self, username: str):
+        self._entries.pop(username, None)
+
+
+class MongoFailedCredentialCache:
+    """
+    FailedCredentialCache shared by all workers through a TTL-indexed MongoDB collection, so a
+    password reset handled by one worker clears the cache for all of them.
+
+    A hit still costs a query, but skips the bcrypt verify.
+    """
+
+    def __init__(self, ttl: float, collection_name: str = "failed_credentials"):
+        self.ttl = ttl
+        self.collection = db[collection_name]
+        self._indexes_ready = False
+
+    async def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        await self.collection.create_index("user")
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self._indexes_ready = True
+
+    async def contains(self, username: str, password: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        await self._ensure_indexes()
+        entry = await self.collection.find_one({
+            "_id": _credential_digest(username, password),
+            # The TTL monitor only runs once a minute
+            "expires_at": {"$gt": datetime.now(timezone.utc)},
+        })
+        return entry is not None
+
+    async def add(self, username: str, password: str):
+        if self.ttl <= 0:
+            return
+        await self._ensure_indexes()
+        await self.collection.replace_one(
+            {"_id": _credential_digest(username, password)},
+            {
+                "user": _credential_digest(username),
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+            },
+            upsert=True,
+        )
+
+    async def invalidate(self, username: str):
+        await self.collection.delete_many({"user": _credential_digest(username)})
+
+
+def get_failed_credential_cache(ttl: float):
+    if settings.RATE_LIMIT_BACKEND == "mongo":
+        return MongoFailedCredentialCache(ttl)
+    return FailedCredentialCache(ttl)
+
+
+# Login protection shared by the auth and password reset routes
+login_username_limiter = SlidingWindowRateLimiter(
+    "login:user", settings.LOGIN_RATE_LIMIT_PER_USERNAME, settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+)
+login_ip_limiter = SlidingWindowRateLimiter(
+    "login:ip", settings.LOGIN_RATE_LIMIT_PER_IP, settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+)
+failed_credentials = get_failed_credential_cache(settings.FAILED_LOGIN_CACHE_SECONDS)
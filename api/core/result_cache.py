@@ -0,0 +1,103 @@
+"""
+Result cache for repeated count submissions.
+
+Clients on flaky networks retry uploads and operators resubmit the same photo. A count result is
+remembered under a hash of the image bytes, the service, the version of the models that produced it
+and the user, so an identical submission reuses the stored object_counts record and its S3 URLs
+instead of uploading and running the models again. Entries expire after RESULT_CACHE_TTL_SECONDS
+(a TTL index on the collection), and new weights change the model version, so results from old
+weights are never served.
+"""
+import base64
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+
+from api.config import settings
+from api.core.db import db
+from api.core.metrics import Counter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+result_cache_lookups_total = Counter(
+    "count_result_cache_lookups_total", "Count result cache lookups", labelnames=("service", "result")
+)
+
+collection = db["count_result_cache"]
+_indexes_ready = False
+
+
+async def _ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    await collection.create_index("expires_at", expireAfterSeconds=0)
+    _indexes_ready = True
+
+
+def image_digest(base64_image: str, roi=None) -> str:
+    """
+    SHA-256 of the decoded image bytes, so differences in base64 line wrapping don't matter, plus
+    the ROI the image is counted in, if any.
+    """
+    digest = hashlib.sha256(base64.b64decode(base64_image)).hexdigest()
+    if roi is not None:
+        digest += f"@{roi.x1},{roi.y1},{roi.x2},{roi.y2}"
+    return digest
+
+
+def _cache_key(service: str, model_version: str, digest: str, user_id) -> str:
+    return f"{service}:{model_version}:{user_id}:{digest}"
+
+
+async def find_cached_result(
+    service: str, model_version: str, digest: str, user_id, render: bool, include_detections: bool
+) -> Optional[dict]:
+    """
+    The object_counts record of an earlier identical submission, or None. Records that lack what
+    this request asks for (an annotated image, stored detections) don't count as hits.
+    """
+    if not settings.RESULT_CACHE_TTL_SECONDS:
+        return None
+    await _ensure_indexes()
+    entry = await collection.find_one({
+        "_id": _cache_key(service, model_version, digest, user_id),
+        # The TTL monitor only runs once a minute
+        "expires_at": {"$gt": datetime.now(timezone.utc)},
+    })
+    record = None
+    if entry:
+        record = await db.object_counts.find_one(
+            {"_id": entry["object_count_id"], "user_id": ObjectId(user_id)}
+        )
+    if record and ((render and not record.get("processed_image_url"))
+                   or (include_detections and "detections" not in record)):
+        record = None
+
+    result_cache_lookups_total.labels(service=service, result="hit" if record else "miss").inc()
+    if record:
+        logger.info(f"Reusing {service} result {record['_id']} for image {digest[:12]}")
+    return record
+
+
+async def remember_result(service: str, model_version: str, digest: str, user_id, object_count_id):
+    """
+    Remember `object_count_id` as the result for this image, service, model version and user.
+    """
+    if not settings.RESULT_CACHE_TTL_SECONDS:
+        return
+    await _ensure_indexes()
+    now = datetime.now(timezone.utc)
+    await collection.replace_one(
+        {"_id": _cache_key(service, model_version, digest, user_id)},
+        {
+            "object_count_id": object_count_id,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=settings.RESULT_CACHE_TTL_SECONDS),
+        },
+        upsert=True,
+    )
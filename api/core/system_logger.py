@@ -1,9 +1,14 @@
-import subprocess
 import datetime
 import json
 import os
-from threading import Lock
+import queue
+import time
+from contextlib import contextmanager
+from collections import deque
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from api.core.metrics import Counter, Gauge, Histogram, process_sampler
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -11,65 +16,122 @@ logger = logging.getLogger(__name__)
 
 LOGS_DIR = os.path.dirname(os.path.abspath(__file__))
 LOGS_FILE = os.path.join(LOGS_DIR, 'logs.txt')
-lock = Lock()
+LOGS_MAX_BYTES = 1024 * 1024
+LOGS_BACKUP_COUNT = 3
+
+# Most recent entries kept in memory for quick inspection
+RECENT_ENTRIES = 500
+recent_requests = deque(maxlen=RECENT_ENTRIES)
+
+# Request stats
+requests_total = Counter("requests_total", "Requests logged through log_request_stats")
+requests_in_flight = Gauge("requests_in_flight", "Requests currently being handled")
+request_duration = Histogram("request_duration_seconds", "Request handling time")
+
+# Entries are handed to a queue and written to the rotating file by a listener thread,
+# so the request path never touches the disk.
+_log_queue = queue.SimpleQueue()
+request_logger = logging.getLogger("api.request_stats")
+request_logger.setLevel(logging.INFO)
+request_logger.propagate = False
+request_logger.addHandler(QueueHandler(_log_queue))
+_listener = None
+
+
+def start_system_logger():
+    """
+    Start the background CPU/RSS sampler and the log writer thread. Called on app startup.
+    """
+    global _listener
+    process_sampler.start()
+    if _listener is None:
+        file_handler = RotatingFileHandler(LOGS_FILE, maxBytes=LOGS_MAX_BYTES, backupCount=LOGS_BACKUP_COUNT)
+        file_handler.setFormatter(logging.Formatter('%(message)s'))
+        _listener = QueueListener(_log_queue, file_handler)
+        _listener.start()
+
+
+def stop_system_logger():
+    """
+    Stop the sampler and flush pending log entries. Called on app shutdown.
+    """
+    global _listener
+    process_sampler.stop()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
-# Keep track of the number of requests
-request_counter = 0
 
 def get_cpu_usage():
-    logger.info("Getting CPU usage")
-    command = "ps -eo pcpu | awk 'NR>1 {sum += $1} END {print sum}'"
-    result = subprocess.run(command, capture_output=True, shell=True, text=True)
-    if result.returncode == 0:
-        cpu_usage = result.stdout.strip() + '%'
-        logger.info(f"CPU usage: {cpu_usage}")
-        return cpu_usage
-    else:
-        logger.error("Error obtaining CPU usage")
-        return "Error obtaining CPU usage"
-
-def trim_logs():
-    logger.info("Trimming logs to keep the size manageable")
-    with lock:
-        try:
-            with open(LOGS_FILE, 'r+') as file:
-                lines = file.readlines()
-                if len(lines) > 500:
-                    logger.info("Log file size exceeds 500 lines, trimming")
-                    file.seek(0)
-                    file.truncate()
-                    file.writelines(lines[-500:])
-        except FileNotFoundError:
-            logger.warning(f"Log file {LOGS_FILE} not found for trimming")
-
-def log_request_stats(request_type, endpoint):
-    global request_counter
-    try:
-        timestamp = datetime.datetime.now().isoformat()
-        cpu_usage = get_cpu_usage()
+    cpu_percent = process_sampler.latest["cpu_percent"]
+    if cpu_percent is None:
+        return "CPU usage not sampled yet"
+    return f"{cpu_percent}%"
 
-        with lock:
-            request_counter += 1
-            current_request_count = request_counter
 
-            log_entry = {
-                'timestamp': timestamp,
-                'request_type': request_type,
-                'endpoint': endpoint,
-                'CPU_usage': cpu_usage,
-                'simultaneous_requests': current_request_count
-            }
+def log_request_stats(request_type, endpoint, duration=None):
+    try:
+        requests_total.inc()
+        if duration is not None:
+            request_duration.observe(duration)
 
-            logger.info(f"Logging request: {log_entry}")
-            with open(LOGS_FILE, 'a') as log_file:
-                log_file.write(json.dumps(log_entry) + '\n')
+        sample = process_sampler.latest
+        log_entry = {
+            'timestamp': datetime.datetime.now().isoformat(),
+            'request_type': request_type,
+            'endpoint': endpoint,
+            'CPU_usage': get_cpu_usage(),
+            'process_CPU_usage': sample["process_cpu_percent"],
+            'rss_bytes': sample["rss_bytes"],
+            'simultaneous_requests': requests_in_flight.value,
+            'duration': duration,
+        }
 
-        trim_logs()
+        recent_requests.append(log_entry)
+        request_logger.info(json.dumps(log_entry))
 
     except Exception as e:
         logger.error(f"An error occurred while logging request stats: {e}", exc_info=True)
+
+
+@contextmanager
+def track_request(request_type, endpoint):
+    """
+    Count a request as in flight while the block runs, then log it with its duration.
+    """
+    requests_in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
     finally:
-        with lock:
-            request_counter -= 1
+        requests_in_flight.dec()
+        log_request_stats(request_type, endpoint, time.perf_counter() - started)
+
+
+class RequestStatsMiddleware:
+    """
+    ASGI middleware that tracks every HTTP request with track_request, so the in-flight gauge, the
+    request counter and latency histogram, and the request log all see it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with track_request(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+
 
-#git change
\ No newline at end of file
+def get_request_stats():
+    """
+    Summary of the request counters, latency histogram and latest process sample.
+    """
+    return {
+        'requests_total': requests_total.value,
+        'requests_in_flight': requests_in_flight.value,
+        'request_duration': request_duration.snapshot(),
+        'process': process_sampler.latest,
+    }
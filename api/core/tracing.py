@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from api.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Trace:
+    """
+    Spans recorded while handling one request. Times are perf_counter seconds.
+    """
+
+    def __init__(self, trace_id: str, method: str, path: str):
+        self.trace_id = trace_id
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.finished = None
+        self.thread_id = threading.get_ident()
+        self.status_code = None
+        self.spans = []
+
+    def add_span(self, name: str, start: float, end: float):
+        # list.append is atomic, so spans can be recorded from executor threads as well
+        self.spans.append((name, start, end, threading.get_ident()))
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value: total time per span name, in first-seen order, plus the total so far.
+        """
+        totals = {}
+        for name, start, end, _ in self.spans:
+            totals[name] = totals.get(name, 0.0) + (end - start)
+        entries = [f"{name};dur={duration * 1000:.1f}" for name, duration in totals.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Chrome Trace Event Format, viewable in Perfetto or chrome://tracing.
+        """
+        def event(name, start, end, tid):
+            return {
+                "name": name,
+                "cat": "request" if name == "request" else "span",
+                "ph": "X",
+                "ts": (self.wall_started + (start - self.started)) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": tid,
+            }
+
+        events = [event("request", self.started, self.finished or time.perf_counter(), self.thread_id)]
+        events.extend(event(*span) for span in self.spans)
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "trace_id": self.trace_id,
+                "method": self.method,
+                "path": self.path,
+                "status_code": self.status_code,
+            },
+        }
+
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+# Client-supplied request ids are reused as trace ids (and in export filenames) only if they look safe
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+@contextmanager
+def span(name: str):
+    """
+    Record the enclosed block as a span of the current request's trace. A no-op outside a request.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter())
+
+
+def traced(name: str):
+    """
+    Decorator recording each call of an async function (e.g. a dependency) as a span.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def export_trace(trace: Trace):
+    os.makedirs(settings.TRACE_EXPORT_DIR, exist_ok=True)
+    filename = f"{int(trace.wall_started * 1000)}_{trace.trace_id}.json"
+    with open(os.path.join(settings.TRACE_EXPORT_DIR, filename), "w") as f:
+        json.dump(trace.to_chrome_trace(), f)
+
+
+def _log_export_failure(future):
+    if future.exception():
+        logger.error(f"Failed to export trace: {future.exception()}")
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that gives each HTTP request a trace id, returns it in X-Trace-Id along with a
+    Server-Timing breakdown of the recorded spans, and exports sampled traces to TRACE_EXPORT_DIR.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        trace = Trace(request_id, scope["method"], scope["path"])
+        token = current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                trace.status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", trace.trace_id.encode("latin-1")))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            trace.finished = time.perf_counter()
+            current_trace.reset(token)
+            if settings.TRACE_SAMPLE_RATE > 0 and random.random() < settings.TRACE_SAMPLE_RATE:
+                # Write the file off the event loop; a failed export only loses the trace
+                future = asyncio.get_running_loop().run_in_executor(None, export_trace, trace)
+                future.add_done_callback(_log_export_failure)
@@ -4,21 +4,45 @@ import logging
 import base64
 import os
 import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from api.config import settings
 from api.core.aws import AWSConfig
+from api.core.cache import TTLCache
+from api.core.metrics import stage_timer
+from api.core.profiler import attributed
+from api.core.tracing import traced
+from api.services.encoding import encode_image
 from datetime import datetime,timezone
 import logging
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException,status
 
 from api.core.db import db
+from bson import ObjectId
 from api.models.user import User
+from api.models.roi import DEFAULT_CAMERA_ID, Roi
 from api.core.oauth2 import get_current_user
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max rounds to the configured cost makes hashes created with any other cost
+# report needs_update, so they get rehashed on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a small dedicated pool keeps hashing off the event loop
+# while bounding how much CPU a burst of logins can take from inference requests.
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -26,6 +50,21 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Verify a password on the password executor.
+
+    :return: Tuple of (verified, new_hash). new_hash is set when the stored hash uses an outdated cost.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_executor, attributed(pwd_context.verify_and_update), plain_password, hashed_password
+    )
+
+async def get_password_hash_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, attributed(pwd_context.hash), password)
+
 
 
 async def check_admin_user(user: dict = Depends(get_current_user)):
@@ -40,6 +79,7 @@ async def check_admin_user(user: dict = Depends(get_current_user)):
 
 
 # Dependency to check if the user has a valid subscription
+@traced("check_valid_subscription")
 async def check_valid_subscription(current_user: User = Depends(get_current_user)):
     try:
         # Ensure the user is authenticated
@@ -155,31 +195,94 @@ async def save_base64_image(base64_str,SERVICE_NAME):
     year = current_date.strftime("%Y")
     month = current_date.strftime("%m")
 
-    # Define the local path for saving the image, organized by year/month
-    local_image_dir = f"../static/{year}/{month}"
-    os.makedirs(local_image_dir, exist_ok=True)  # Ensure the directory exists
-
-    # Define the image path
-    original_image_filename = f"original_{uuid.uuid4()}.png"
-    original_image_path = os.path.join(local_image_dir, original_image_filename)
-
-    # Write the image data to a local file
-    with open(original_image_path, "wb") as f:
-        f.write(image_data)
-
     # Define the bucket and object path in S3, organized by year/month
+    original_image_filename = f"original_{uuid.uuid4()}.png"
     bucket_name = "alvision-count"
     object_name = f"count/{SERVICE_NAME}/original/{year}/{month}/{original_image_filename}"
 
-    # Use the existing upload_to_s3 method
+    # Upload straight from memory; boto3 blocks, so on a worker thread to keep the event loop free
     aws_config = AWSConfig()
-    original_image_url = aws_config.upload_to_s3(
-        original_image_path, bucket_name, object_name
-    )
+    with stage_timer("s3_upload"):
+        original_image_url = await asyncio.to_thread(
+            attributed(aws_config.upload_bytes_to_s3), image_data, bucket_name, object_name
+        )
 
     logger.info(f"Original image saved to {original_image_url}")
 
-    # Optionally, remove the local file if not needed
-    os.remove(original_image_path)
-
     return original_image_url
+
+
+async def save_processed_image(img, SERVICE_NAME):
+    """
+    Encode an annotated image and upload it to S3. Returns its URL, None if the upload failed.
+    """
+    with stage_timer("encode"):
+        encoded, extension, content_type = await asyncio.to_thread(attributed(encode_image), img)
+
+    bucket_name = "alvision-count"
+    object_name = f"count/{SERVICE_NAME}/processed/processed_{uuid.uuid4()}.{extension}"
+    aws_config = AWSConfig()
+    with stage_timer("s3_upload"):
+        return await asyncio.to_thread(
+            attributed(aws_config.upload_bytes_to_s3), encoded, bucket_name, object_name, content_type
+        )
+
+
+def _log_upload_failure(task):
+    if not task.cancelled() and task.exception():
+        logger.error(f"Failed to save original image: {task.exception()}")
+
+
+def start_original_upload(base64_str, SERVICE_NAME) -> asyncio.Task:
+    """
+    Start save_base64_image in the background, so the upload overlaps with inference. Await the
+    returned task for the URL; a failure is logged even if the request errors out before that.
+    """
+    task = asyncio.create_task(save_base64_image(base64_str, SERVICE_NAME))
+    task.add_done_callback(_log_upload_failure)
+    return task
+
+
+def render_by_default(service_name: str) -> bool:
+    """
+    Whether count requests for `service_name` render and upload an annotated image when the
+    request doesn't say; services listed in COUNT_LITE_SERVICES only return the count.
+    """
+    lite_services = {name.strip() for name in settings.COUNT_LITE_SERVICES.split(",") if name.strip()}
+    return service_name not in lite_services
+
+
+# Saved ROIs by user id, as {camera_id: Roi}; users without any are cached too, so count requests
+# don't pay a database round trip for ROIs that aren't configured
+saved_rois = TTLCache(settings.ROI_CACHE_SECONDS, settings.ROI_CACHE_SIZE)
+
+
+async def get_saved_rois(user_id) -> dict:
+    """
+    The user's saved ROIs by camera id, cached for ROI_CACHE_SECONDS.
+    """
+    rois = saved_rois.get(str(user_id))
+    if rois is None:
+        saved = await db.rois.find({"user_id": ObjectId(user_id)}, {"camera_id": 1, "roi": 1}).to_list(length=None)
+        rois = {roi["camera_id"]: Roi(**roi["roi"]) for roi in saved}
+        saved_rois.put(str(user_id), rois)
+    return rois
+
+
+def forget_saved_rois(user_id):
+    """
+    Drop this worker's cached ROIs for the user, after they change.
+    """
+    saved_rois.pop(str(user_id))
+
+
+async def resolve_roi(count_request, user_id):
+    """
+    The region a count request should be counted in: the request's own ROI, otherwise the one the user
+    saved for the request's camera, falling back to their default one. None means the pipe region is
+    segmented.
+    """
+    if count_request.roi is not None:
+        return count_request.roi
+    rois = await get_saved_rois(user_id)
+    return rois.get(count_request.camera_id or DEFAULT_CAMERA_ID, rois.get(DEFAULT_CAMERA_ID))
@@ -1,10 +1,11 @@
 from pydantic import BaseModel, Field
 from bson import ObjectId
-from typing import Any
+from typing import Any, Optional, List
 from pydantic_core import core_schema, CoreSchema
 from pydantic import GetCoreSchemaHandler
 from pydantic.json_schema import GetJsonSchemaHandler, JsonSchemaValue
 from datetime import datetime
+from api.models.roi import Roi
 
 class PyObjectId(ObjectId):
     @classmethod
@@ -35,7 +36,7 @@ class ObjectCount(BaseModel):
     object_count: int
     timestamp: datetime
     original_image_url: str   # s3 url
-    processed_image_url: str  # s3 url
+    processed_image_url: Optional[str] = None  # s3 url; None when the count wasn't rendered
     category: str
     user_id: PyObjectId   # User ID who is going to count
 
@@ -57,6 +58,7 @@ class ObjectCount(BaseModel):
 class ObjectCountResponse(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     object_count: ObjectCount
+    detections: Optional[List[List[int]]] = None  # [x1, y1, x2, y2, class_id] in the uploaded image's pixels
 
     class Config:
         populate_by_name = True
@@ -79,3 +81,7 @@ class ObjectCountResponse(BaseModel):
 
 class CountRequest(BaseModel):
     base64_image: str
+    render: Optional[bool] = None  # draw and upload the annotated image; None uses the service default
+    include_detections: bool = False  # return the detected boxes with the count
+    roi: Optional[Roi] = None  # count only this region of the upload, skipping segmentation
+    camera_id: Optional[str] = None  # use the ROI saved for this camera instead of the user's default one
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+# Camera id of the ROI used for requests that don't name a camera
+DEFAULT_CAMERA_ID = "default"
+
+
+class Roi(BaseModel):
+    """
+    Region of interest in the uploaded image's pixels. Counting in a known region skips the
+    segmentation model.
+    """
+    x1: int = Field(ge=0)
+    y1: int = Field(ge=0)
+    x2: int = Field(gt=0)
+    y2: int = Field(gt=0)
+
+    @model_validator(mode="after")
+    def check_corners(self):
+        if self.x2 <= self.x1 or self.y2 <= self.y1:
+            raise ValueError("ROI must have x2 > x1 and y2 > y1")
+        return self
+
+
+class SavedRoiRequest(BaseModel):
+    roi: Roi
+
+
+class SavedRoiResponse(BaseModel):
+    camera_id: str
+    roi: Roi
+    updated_at: Optional[datetime] = None
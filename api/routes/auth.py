@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from api.models.user import Token
 from api.core.db import db
 from api.core.oauth2 import create_access_token,oauth2_scheme
-from api.core.utils import verify_password
+from api.core.utils import verify_password_async
+from api.core.rate_limit import login_username_limiter, login_ip_limiter, failed_credentials
 from datetime import datetime, timezone
 import logging
 
@@ -14,19 +15,54 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @router.post("", response_model=Token, status_code=status.HTTP_200_OK)
-async def login(user_credentials: OAuth2PasswordRequestForm = Depends()):
+async def login(request: Request, user_credentials: OAuth2PasswordRequestForm = Depends()):
+    # The cache and the database lookup must see the same username; the limiter ignores case
+    username = user_credentials.username.strip()
+    client_ip = request.client.host if request.client else "unknown"
+
+    # Reject abusive bursts before paying for the database query and bcrypt verify
+    for limiter, key in ((login_ip_limiter, client_ip), (login_username_limiter, username.lower())):
+        retry_after = await limiter.hit(key)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts. Please try again later.",
+                headers={"Retry-After": str(int(retry_after) + 1)}
+            )
+
+    if await failed_credentials.contains(username, user_credentials.password):
+        logger.warning("Repeated invalid credentials for user: %s", user_credentials.username)
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid username or password"
+        )
+
     # Fetch user from the database
     user = await db["users"].find_one({
-        "$or": [{"name": user_credentials.username}, {"email": user_credentials.username}]
+        "$or": [{"name": username}, {"email": username}]
     })
 
-    if not user or not verify_password(user_credentials.password, user["password"]):
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await verify_password_async(user_credentials.password, user["password"])
+
+    if not verified:
+        await failed_credentials.add(username, user_credentials.password)
         logger.warning("Invalid credentials for user: %s", user_credentials.username)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid username or password"
         )
 
+    # Upgrade the stored hash if it was created with a different bcrypt cost
+    if new_hash:
+        await db["users"].update_one(
+            {"_id": user["_id"], "password": user["password"]}, {"$set": {"password": new_hash}}
+        )
+        logger.info("Upgraded password hash for user: %s", user_credentials.username)
+
+    await login_username_limiter.reset(username.lower())
+
     # Check for active subscription
     user_id = user["_id"]
     subscriptions = await db["subscriptions"].find({"user_id": user_id}).to_list(length=None)
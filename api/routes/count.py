@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from api.config import settings
+from api.core.db import db
+from api.core.metrics import inference_slot, instrument_count, stage_timer
+from api.core.oauth2 import get_current_user
+from api.core.profiler import attributed
+from api.core.result_cache import find_cached_result, image_digest, remember_result
+from api.core.utils import (
+    check_valid_subscription,
+    render_by_default,
+    resolve_roi,
+    save_processed_image,
+    start_original_upload,
+)
+from api.models.count import CountRequest, ObjectCount, ObjectCountResponse
+from api.models.user import User
+from api.services.detections import pack_detections, to_upload_boxes, unpack_detections
+from api.services.engine import count_detections, profile_model_version, render_detections, run_count
+from api.services.profiles import COUNT_PROFILES, ServiceProfile
+
+router = APIRouter(tags=["Count"])
+
+# Logging configuration
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def count_objects(
+    profile: ServiceProfile, count_request: CountRequest, user, service_name: str = None
+) -> ObjectCountResponse:
+    """
+    The count pipeline shared by every service: result cache, original upload overlapped with
+    inference, rendering and processed upload, and the object_counts record. `service_name` files
+    the count under another category than the profile's, e.g. testServe's work-order counts.
+    """
+    service_name = service_name or profile.name
+    render = count_request.render if count_request.render is not None else render_by_default(service_name)
+    # A known region of interest replaces the segmentation pass
+    roi = await resolve_roi(count_request, user["_id"])
+
+    # Reuse the result of an identical earlier submission
+    version = image_hash = None
+    if settings.RESULT_CACHE_TTL_SECONDS:
+        image_hash = image_digest(count_request.base64_image, roi)
+        # The first call loads (and may export) the models; keep that off the event loop
+        with stage_timer("model_load"):
+            version = await asyncio.to_thread(attributed(profile_model_version), profile)
+        cached = await find_cached_result(
+            service_name, version, image_hash, user["_id"], render, count_request.include_detections
+        )
+        if cached:
+            detected_boxes = to_upload_boxes(unpack_detections(cached["detections"])) if count_request.include_detections else None
+            return ObjectCountResponse(object_count=ObjectCount(**cached), detections=detected_boxes)
+
+    # Upload the original image in the background while the models run
+    original_upload = start_original_upload(count_request.base64_image, service_name)
+
+    # Segment and count on a worker thread while the upload runs; counts on the segmented region if
+    # one was found, otherwise on the original image
+    with inference_slot():
+        img, detections, scale, crop_origin = await asyncio.to_thread(
+            attributed(run_count), profile, count_request.base64_image, roi
+        )
+
+    if img is None:
+        raise HTTPException(status_code=500, detail="Failed to process image.")
+
+    count_value = count_detections(profile, detections)
+
+    # Lite requests skip drawing and the processed-image upload
+    processed_image_url = None
+    if render:
+        # Drawing and encoding are CPU-bound (WebP especially); keep them off the event loop
+        processed_img = await asyncio.to_thread(attributed(render_detections), profile, img, detections)
+        processed_image_url = await save_processed_image(processed_img, service_name)
+
+    original_image_url = await original_upload
+
+    # Get the current IST timestamp
+    current_utc_datetime = datetime.utcnow()
+    ist_offset = timedelta(hours=5, minutes=30)
+    current_ist_datetime = current_utc_datetime + ist_offset
+
+    # Create and save the ObjectCount instance
+    object_count = ObjectCount(
+        object_count=count_value,
+        timestamp=current_ist_datetime,
+        original_image_url=original_image_url,
+        processed_image_url=processed_image_url,
+        user_id=user["_id"],
+        category=service_name,
+    )
+    with stage_timer("mongo_insert"):
+        await db["object_counts"].insert_one(
+            {**object_count.model_dump(by_alias=True), "detections": pack_detections(detections, scale, crop_origin)}
+        )
+    if version is not None:
+        await remember_result(service_name, version, image_hash, user["_id"], object_count.id)
+
+    detected_boxes = to_upload_boxes(detections, scale, crop_origin) if count_request.include_detections else None
+    return ObjectCountResponse(object_count=object_count, detections=detected_boxes)
+
+
+def add_count_route(profile: ServiceProfile):
+    # The CPU profiler attributes these by route path (RouteAttributionMiddleware), not by endpoint
+    @router.post(f"/{profile.name}", name=f"count_{profile.name}")
+    @instrument_count(profile.name)
+    async def count_with_yolo(
+        count_request: CountRequest,
+        user: User = Depends(get_current_user),
+        is_valid_subscription: bool = Depends(check_valid_subscription),
+    ):
+        """
+        Count objects in the image with this service's profile. Requires the user to have an active
+        subscription for the service.
+        """
+        if not is_valid_subscription:
+            return {"message": f"You do not have an active subscription for the {profile.label} service."}
+        return await count_objects(profile, count_request, user)
+
+
+# One POST /<service> endpoint per counting service
+for _profile in COUNT_PROFILES:
+    add_count_route(_profile)
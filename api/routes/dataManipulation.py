@@ -42,7 +42,8 @@ async def get_no_of_requests(date: date, category: str = None):
     print(f"Querying with: {query}")
 
     # Query the `object_counts` collection with the built query
-    results = await db.object_counts.find(query).to_list(length=None)
+    # Leave out the packed detections: they are binary and only used for re-rendering
+    results = await db.object_counts.find(query, {"detections": 0}).to_list(length=None)
 
     # Print the results for debugging purposes
     print(f"Found object counts: {results}")
@@ -86,7 +87,8 @@ async def get_user_data_by_date_and_category(
     print(f"Querying with: {query}")
 
     # Query the `object_counts` collection for the logged-in user
-    results = await db.object_counts.find(query).to_list(length=None)
+    # Leave out the packed detections: they are binary and only used for re-rendering
+    results = await db.object_counts.find(query, {"detections": 0}).to_list(length=None)
 
     # Convert ObjectId fields to strings for JSON serialization
     for result in results:
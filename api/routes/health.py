@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, status
+import logging
+
+from api.core.db import ping_db, pool_stats
+from api.core.system_logger import get_request_stats
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@router.get("/db")
+async def database_health():
+    """
+    Ping the database and report connection pool utilisation, for sizing the pool against the worker count.
+    """
+    try:
+        latency_ms = await ping_db()
+    except Exception as e:
+        logger.error(f"Database ping failed: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable")
+
+    return {"status": "ok", "ping_ms": round(latency_ms, 2), "pool": pool_stats.snapshot()}
+
+
+@router.get("/requests")
+async def request_health():
+    """
+    Request counts, latency distribution and requests in flight in this worker, with the latest
+    CPU/RSS sample.
+    """
+    return get_request_stats()
@@ -5,7 +5,8 @@ from api.models.user import PasswordReset, PasswordResetRequest
 from api.core.db import db
 from api.core.send_email import password_reset
 from api.core.oauth2 import create_access_token, get_current_user
-from api.core.utils import get_password_hash
+from api.core.utils import get_password_hash_async
+from api.core.rate_limit import failed_credentials
 
 router = APIRouter(
     prefix="/password",
@@ -51,7 +52,7 @@ async def reset_password(token: str, new_password: PasswordReset):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
 
     # Hash the new password
-    hashed_password = get_password_hash(new_password.password)
+    hashed_password = await get_password_hash_async(new_password.password)
 
     # Update the password in the database
     update_result = await db["users"].update_one(
@@ -65,4 +66,8 @@ async def reset_password(token: str, new_password: PasswordReset):
             detail="Failed to update the password"
         )
 
+    # Forget recently failed attempts so the new password is not rejected from the cache
+    await failed_credentials.invalidate(user["name"])
+    await failed_credentials.invalidate(user["email"])
+
     return {"msg": "Password successfully reset"}
\ No newline at end of file
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+
+from api.core.utils import check_admin_user
+from api.core.profiler import (
+    ProfilerBusyError,
+    allocation_report,
+    build_route_map,
+    profile_cpu,
+    start_allocation_tracing,
+    stop_allocation_tracing,
+)
+
+router = APIRouter(
+    prefix="/admin/profiling",
+    tags=["Profiling"],
+    dependencies=[Depends(check_admin_user)],
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def download(content: str, name: str) -> PlainTextResponse:
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
+    return PlainTextResponse(content, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.post("/cpu")
+async def cpu_profile(
+    request: Request,
+    seconds: float = Query(10, gt=0, le=120),
+    interval_ms: float = Query(5, ge=1, le=1000),
+):
+    """
+    Sample this worker's stacks for `seconds` while it keeps serving traffic, and download the result
+    as collapsed stacks grouped per route (load into speedscope or flamegraph.pl).
+    """
+    route_map = build_route_map(request.app)
+    try:
+        folded = await asyncio.to_thread(profile_cpu, seconds, interval_ms / 1000, route_map)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return download(folded, "cpu-profile")
+
+
+@router.post("/allocations/start")
+async def start_allocations(frames: int = Query(25, ge=1, le=100)):
+    """
+    Start tracing allocations. Tracing slows the worker down, so stop it when done.
+    """
+    start_allocation_tracing(frames)
+    return {"msg": "Allocation tracing started", "frames": frames}
+
+
+@router.get("/allocations")
+async def allocations(limit: int = Query(50, ge=1, le=500), compare: bool = False):
+    """
+    Download the top allocation sites, or their growth since the previous snapshot when `compare` is set.
+    """
+    try:
+        report = await asyncio.to_thread(allocation_report, limit, compare)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return download(report, "allocations")
+
+
+@router.post("/allocations/stop")
+async def stop_allocations():
+    stop_allocation_tracing()
+    return {"msg": "Allocation tracing stopped"}
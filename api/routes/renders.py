@@ -0,0 +1,89 @@
+import asyncio
+import logging
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from api.config import settings
+from api.core.aws import AWSConfig
+from api.core.cache import LRUCache
+from api.core.db import db
+from api.core.metrics import stage_timer
+from api.core.oauth2 import get_current_user
+from api.core.profiler import attributed
+from api.services.detections import unpack_detections
+from api.services.encoding import ENCODINGS, encode_image
+from api.services.engine import render_detections
+from api.services.preprocess import decode_image, image_size
+from api.services.profiles import CATEGORY_PROFILES
+
+router = APIRouter(prefix="/object-counts", tags=["Count"])
+
+# Logging configuration
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+aws_config = AWSConfig()
+
+BUCKET_NAME = "alvision-count"
+
+# Encoded renders by (record id, count); a manual count correction changes the key
+rendered_images = LRUCache(settings.RENDER_CACHE_MAX_BYTES)
+
+
+def render_record(record: dict) -> bytes:
+    """
+    Draw a record's stored detections on its original image and encode the result like the
+    annotated images uploaded by the count routes.
+    """
+    with stage_timer("s3_download"):
+        data = aws_config.download_from_s3(record["original_image_url"], BUCKET_NAME)
+    if data is None:
+        raise HTTPException(status_code=502, detail="Failed to fetch the original image.")
+
+    with stage_timer("decode"):
+        size = image_size(data)
+        img = decode_image(data, settings.RENDER_MAX_SIDE)
+    if img is None:
+        raise HTTPException(status_code=500, detail="Failed to decode the original image.")
+
+    # Stored boxes are in the original image's pixels
+    detections = unpack_detections(record["detections"])
+    if size:
+        detections[:, :4] *= max(img.shape[:2]) / max(size)
+
+    rendered = render_detections(CATEGORY_PROFILES[record["category"]], img, detections, total=record["object_count"])
+    with stage_timer("encode"):
+        content, _, _ = encode_image(rendered)
+    return content
+
+
+@router.get("/{object_count_id}/render")
+async def render_object_count(object_count_id: str, user: dict = Depends(get_current_user)):
+    """
+    Annotated image for one of the user's counts, drawn from the original image and the detections
+    stored with the count. Works for counts made without rendering, and shows manual corrections.
+    """
+    if not ObjectId.is_valid(object_count_id):
+        raise HTTPException(status_code=400, detail="Invalid object count id")
+
+    record = await db.object_counts.find_one(
+        {"_id": ObjectId(object_count_id), "user_id": ObjectId(user["_id"])}
+    )
+    if not record:
+        raise HTTPException(status_code=404, detail="Object count not found")
+    if "detections" not in record or record.get("category") not in CATEGORY_PROFILES:
+        raise HTTPException(status_code=404, detail="No stored detections for this count")
+
+    cache_key = (object_count_id, record["object_count"])
+    content = rendered_images.get(cache_key)
+    if content is None:
+        # Decoding and drawing are CPU-bound; keep them off the event loop
+        content = await asyncio.to_thread(attributed(render_record), record)
+        rendered_images.put(cache_key, content)
+        logger.info(f"Rendered object count {object_count_id} ({len(content)} bytes)")
+
+    _, media_type, _ = ENCODINGS[settings.PROCESSED_IMAGE_FORMAT.lower()]
+    return Response(content=content, media_type=media_type)
@@ -0,0 +1,60 @@
+import logging
+from datetime import datetime
+from typing import List
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException
+
+from api.core.db import db
+from api.core.oauth2 import get_current_user
+from api.core.utils import forget_saved_rois
+from api.models.roi import SavedRoiRequest, SavedRoiResponse
+
+router = APIRouter(prefix="/rois", tags=["Count"])
+
+# Logging configuration
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+@router.get("", response_model=List[SavedRoiResponse])
+async def list_rois(user: dict = Depends(get_current_user)):
+    """
+    The user's saved regions of interest, one per camera.
+    """
+    rois = await db.rois.find({"user_id": ObjectId(user["_id"])}).to_list(length=None)
+    return [SavedRoiResponse(**roi) for roi in rois]
+
+
+@router.put("/{camera_id}", response_model=SavedRoiResponse)
+async def save_roi(camera_id: str, request: SavedRoiRequest, user: dict = Depends(get_current_user)):
+    """
+    Save the region of interest for a fixed camera. Count requests with this `camera_id` are counted
+    in it without running the segmentation model; the "default" camera applies to requests that
+    don't name one or name a camera without its own ROI. Other workers pick up the change within
+    ROI_CACHE_SECONDS.
+    """
+    saved = {"camera_id": camera_id, "roi": request.roi.model_dump(), "updated_at": datetime.utcnow()}
+    await db.rois.update_one(
+        {"user_id": ObjectId(user["_id"]), "camera_id": camera_id},
+        {"$set": saved},
+        upsert=True,
+    )
+    forget_saved_rois(user["_id"])
+    logger.info(f"Saved ROI for camera {camera_id} of user {user['_id']}")
+    return SavedRoiResponse(**saved)
+
+
+@router.delete("/{camera_id}")
+async def delete_roi(camera_id: str, user: dict = Depends(get_current_user)):
+    """
+    Remove a saved region of interest; that camera's requests fall back to the default ROI, or are
+    segmented again if there is none.
+    """
+    result = await db.rois.delete_one({"user_id": ObjectId(user["_id"]), "camera_id": camera_id})
+    forget_saved_rois(user["_id"])
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="No ROI saved for this camera")
+    return {"msg": f"ROI for camera {camera_id} deleted"}
@@ -1,10 +1,15 @@
 import logging
-from fastapi import HTTPException,APIRouter, Request
+from fastapi import HTTPException,APIRouter, Depends, Request
 from razorpay.errors import  SignatureVerificationError
 from api.core.db import db
 from api.config import settings
 from api.core.razorpay import client
+from api.core.utils import check_admin_user
 import time
+import uuid
+from typing import List, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
+
 router = APIRouter(
     prefix="/webhook",
     tags=["Subscriptions"],
@@ -16,6 +21,34 @@ logger = logging.getLogger(__name__)
 
 # Initialize Razorpay client
 
+# Webhook event -> (subscription status, whether to add the plan's service to the user)
+SUBSCRIPTION_EVENTS = {
+    "subscription.activated": ("active", True),
+    "subscription.completed": ("completed", True),
+    "subscription.halted": ("halted", False),
+    "payment.failed": ("payment_failed", False),
+}
+
+
+def parse_subscription_event(webhook_data: dict) -> Optional[Tuple[str, str, bool]]:
+    """
+    Map a Razorpay webhook payload to a (subscription_id, status, add_services) event, or None if it is not handled.
+    """
+    event = webhook_data.get("event")
+    if event not in SUBSCRIPTION_EVENTS:
+        return None
+
+    status, add_services = SUBSCRIPTION_EVENTS[event]
+    if event == "payment.failed":
+        subscription_id = webhook_data["payload"]["payment"]["entity"].get("subscription_id")
+    else:
+        subscription_id = webhook_data["payload"]["subscription"]["entity"]["id"]
+
+    if not subscription_id:
+        return None
+    return subscription_id, status, add_services
+
+
 @router.post("/webhook")
 async def handle_webhook(request: Request):
     """
@@ -40,90 +73,200 @@ async def handle_webhook(request: Request):
     event = webhook_data.get("event")
     logger.info(f"Received event: {event}")
 
-    if event == "subscription.activated":
-        # Subscription has been activated
-        subscription_entity = webhook_data["payload"]["subscription"]["entity"]
-        subscription_id = subscription_entity["id"]
-        logger.info(f"Subscription {subscription_id} activated")
+    subscription_event = parse_subscription_event(webhook_data)
+    if subscription_event:
+        subscription_id, status, add_services = subscription_event
+        logger.info(f"Subscription {subscription_id} event {event} -> {status}")
 
-        # Update subscription status in MongoDB and add services to the user
-        await update_subscription_status(subscription_id, status="active", add_services=True)
+        # Update subscription status in MongoDB and, for activations/completions, add services to the user
+        await update_subscription_status(subscription_id, status=status, add_services=add_services)
+    elif event not in SUBSCRIPTION_EVENTS:
+        logger.warning(f"Unhandled event: {event}")
 
-    elif event == "subscription.completed":
-        # Subscription has been completed
-        subscription_entity = webhook_data["payload"]["subscription"]["entity"]
-        subscription_id = subscription_entity["id"]
-        logger.info(f"Subscription {subscription_id} completed")
+    return {"status": "ok"}
 
-        # Update subscription status in MongoDB and add services to the user
-        await update_subscription_status(subscription_id, status="completed", add_services=True)
 
-    elif event == "subscription.halted":
-        # Subscription has been halted due to issues (e.g., payment failure)
-        subscription_entity = webhook_data["payload"]["subscription"]["entity"]
-        subscription_id = subscription_entity["id"]
-        logger.info(f"Subscription {subscription_id} halted")
+@router.post("/replay", dependencies=[Depends(check_admin_user)])
+async def replay_webhooks(webhooks: List[dict]):
+    """
+    Apply a backlog of Razorpay webhook payloads in order, e.g. deliveries missed during an outage
+    and exported from the Razorpay dashboard. Admin only; payloads are not signature-checked.
+    """
+    events = []
+    for webhook_data in webhooks:
+        try:
+            subscription_event = parse_subscription_event(webhook_data)
+        except (KeyError, TypeError):
+            raise HTTPException(status_code=400, detail=f"Malformed {webhook_data.get('event')} webhook payload")
+        if subscription_event:
+            events.append(subscription_event)
 
-        # Update subscription status in MongoDB
-        await update_subscription_status(subscription_id, status="halted")
+    applied = await apply_subscription_events(events)
+    logger.info(f"Replayed {len(webhooks)} webhooks: {len(events)} subscription events, {applied} transitions applied")
+    return {"status": "ok", "events": len(events), "applied": applied}
 
-    elif event == "payment.failed":
-        # Handle failed payment
-        payment_entity = webhook_data["payload"]["payment"]["entity"]
-        subscription_id = payment_entity.get("subscription_id")
-        logger.info(f"Payment failed for subscription {subscription_id}")
+# Statuses a subscription can no longer leave once reached
+TERMINAL_STATUSES = ("cancelled", "completed", "expired")
 
-        if subscription_id:
-            # Update subscription status in MongoDB
-            await update_subscription_status(subscription_id, status="payment_failed")
+# Cache of razorpay_plan_id -> (plan name, cached at)
+PLAN_CACHE_TTL_SECONDS = 300
+_plan_name_cache = {}
 
-    else:
-        logger.warning(f"Unhandled event: {event}")
 
-    return {"status": "ok"}
+def transition_filter(subscription_id: str, status: str) -> dict:
+    """
+    Build the guarded filter for moving a subscription to `status`.
+
+    The filter only matches while the subscription is in a non-terminal state that differs from
+    the target, so duplicate or out-of-order webhook deliveries cannot regress or re-apply a transition.
+    """
+    return {
+        "subscription_id": subscription_id,
+        "status": {"$nin": [*TERMINAL_STATUSES, status]},
+    }
+
+
+def can_transition(current_status: str, status: str) -> bool:
+    """
+    In-memory equivalent of `transition_filter`, used when replaying queued events.
+    """
+    return current_status not in TERMINAL_STATUSES and current_status != status
+
+
+async def get_plan_name(plan_id: str):
+    """
+    Return the service name for a Razorpay plan, caching lookups for PLAN_CACHE_TTL_SECONDS.
+    """
+    cached = _plan_name_cache.get(plan_id)
+    if cached and time.monotonic() - cached[1] < PLAN_CACHE_TTL_SECONDS:
+        return cached[0]
+
+    plan = await db.plans.find_one({"razorpay_plan_id": plan_id}, {"name": 1})
+    if not plan:
+        return None
+
+    _plan_name_cache[plan_id] = (plan.get("name"), time.monotonic())
+    return plan.get("name")
+
 
 async def update_subscription_status(subscription_id: str, status: str, add_services: bool = False):
     """
-    Helper function to update the subscription status in MongoDB and optionally add services to the user.
+    Helper function to atomically update the subscription status in MongoDB and optionally add services to the user.
     """
     try:
-        # Fetch the subscription from MongoDB
-        subscription = await db.subscriptions.find_one({'subscription_id': subscription_id})
+        # Apply the transition and fetch the fields we need in a single round trip
+        subscription = await db.subscriptions.find_one_and_update(
+            transition_filter(subscription_id, status),
+            {"$set": {"status": status, "updated_at": time.time()}},
+            projection={"user_id": 1, "plan_id": 1, "status": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
 
         if not subscription:
-            logger.error(f"Subscription not found for subscription_id: {subscription_id}")
+            # Expected for retried, duplicate or out-of-order deliveries
+            logger.warning(f"Subscription {subscription_id} not found or cannot transition to {status}")
             return
 
-        # Update the subscription status in MongoDB
-        result = await db.subscriptions.update_one(
-            {"subscription_id": subscription_id},
-            {"$set": {"status": status, "updated_at": time.time()}}
-        )
+        logger.info(f"Subscription {subscription_id} status updated from {subscription.get('status')} to {status}")
+
+        # If the subscription was activated or completed, add the services to the user's document
+        if add_services and subscription.get('user_id'):
+            plan_id = subscription.get('plan_id')
+            service_name = await get_plan_name(plan_id)
+
+            if service_name:
+                # Add the service to the user's document
+                await db.users.update_one(
+                    {"_id": subscription['user_id']},
+                    {"$addToSet": {"subscribed_services": service_name}}  # Add to set to avoid duplicates
+                )
+                logger.info(f"Added service {service_name} to user {subscription['user_id']}")
+            else:
+                logger.error(f"Plan not found for plan_id: {plan_id}")
 
-        if result.modified_count > 0:
-            logger.info(f"Subscription {subscription_id} status updated to {status}")
-
-            # If the subscription was activated or completed, add the services to the user's document
-            if add_services and subscription.get('user_id'):
-                plan_id = subscription.get('plan_id')
-
-                # Fetch the plan details to get the service name
-                plan = await db.plans.find_one({"razorpay_plan_id": plan_id})
-                if plan:
-                    service_name = plan.get('name')
-
-                    # Add the service to the user's document
-                    await db.users.update_one(
-                        {"_id": subscription['user_id']}, 
-                        {"$addToSet": {"subscribed_services": service_name}}  # Add to set to avoid duplicates
-                    )
-                    logger.info(f"Added service {service_name} to user {subscription['user_id']}")
-                else:
-                    logger.error(f"Plan not found for plan_id: {plan_id}")
-
-        else:
-            logger.error(f"Failed to update subscription {subscription_id} status to {status}")
     except Exception as e:
         logger.error(f"Error updating subscription status: {str(e)}")
 
 
+async def apply_subscription_events(events: List[Tuple[str, str, bool]]) -> int:
+    """
+    Apply a backlog of queued (subscription_id, status, add_services) events with bulk writes, and
+    return the number of subscriptions updated.
+
+    Events are replayed in order against the current statuses so each subscription gets a single
+    guarded update with its final status, and services are granted with one bulk write on users,
+    only for subscriptions whose update went through.
+    """
+    if not events:
+        return 0
+
+    try:
+        subscription_ids = list({subscription_id for subscription_id, _, _ in events})
+        subscriptions = await db.subscriptions.find(
+            {"subscription_id": {"$in": subscription_ids}},
+            {"subscription_id": 1, "user_id": 1, "plan_id": 1, "status": 1},
+        ).to_list(length=None)
+        by_id = {sub["subscription_id"]: sub for sub in subscriptions}
+
+        # Replay the events through the state machine to find each subscription's final status
+        final_status = {}
+        grant_services = set()
+        for subscription_id, status, add_services in events:
+            subscription = by_id.get(subscription_id)
+            if not subscription:
+                logger.error(f"Subscription not found for subscription_id: {subscription_id}")
+                continue
+
+            current_status = final_status.get(subscription_id, subscription["status"])
+            if not can_transition(current_status, status):
+                continue
+
+            final_status[subscription_id] = status
+            if add_services:
+                grant_services.add(subscription_id)
+
+        if not final_status:
+            return 0
+
+        now = time.time()
+        # Stamped on every subscription this batch transitions, to tell which guarded updates applied
+        batch_id = uuid.uuid4().hex
+        result = await db.subscriptions.bulk_write(
+            [
+                UpdateOne(
+                    {"subscription_id": subscription_id, "status": by_id[subscription_id]["status"]},
+                    {"$set": {"status": status, "updated_at": now, "transition_batch_id": batch_id}},
+                )
+                for subscription_id, status in final_status.items()
+            ],
+            ordered=False,
+        )
+        logger.info(f"Applied {result.modified_count} of {len(final_status)} queued subscription transitions")
+
+        if grant_services and result.matched_count < len(final_status):
+            # Some statuses changed concurrently and their guarded update matched nothing; only
+            # subscriptions stamped with this batch's id were transitioned here
+            applied = await db.subscriptions.find(
+                {"subscription_id": {"$in": list(grant_services)}, "transition_batch_id": batch_id},
+                {"subscription_id": 1},
+            ).to_list(length=None)
+            grant_services &= {sub["subscription_id"] for sub in applied}
+
+        user_updates = []
+        for subscription_id in grant_services:
+            subscription = by_id[subscription_id]
+            service_name = await get_plan_name(subscription.get("plan_id"))
+            if subscription.get("user_id") and service_name:
+                user_updates.append(UpdateOne(
+                    {"_id": subscription["user_id"]},
+                    {"$addToSet": {"subscribed_services": service_name}}
+                ))
+
+        if user_updates:
+            await db.users.bulk_write(user_updates, ordered=False)
+
+        return result.modified_count
+
+    except Exception as e:
+        logger.error(f"Error applying queued subscription events: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error applying queued subscription events")
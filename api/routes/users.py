@@ -5,9 +5,10 @@ from fastapi.encoders import jsonable_encoder
 from api.core.oauth2 import get_current_user
 from api.core.db import db
 from api.models.user import User,UserResponse
-from api.core.utils import get_password_hash
+from api.core.utils import get_password_hash_async
 from api.core.send_email import send_registration_mail
 from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter(
     prefix="/users",
@@ -19,20 +20,8 @@ router = APIRouter(
 async def registration(user_info: User):
     user_info = jsonable_encoder(user_info)
 
-    # check for duplications
-    username_found = await db["users"].find_one({"name": user_info["name"]})
-    email_found = await db["users"].find_one({"email": user_info["email"]})
-
-    if username_found:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                            detail="There already is a user by that name")
-
-    if email_found:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                            detail="There already is a user by that email")
-
     # hash the user password
-    user_info["password"] = get_password_hash(user_info["password"])
+    user_info["password"] = await get_password_hash_async(user_info["password"])
 
     # generate apiKey
     # user_info["apiKey"] = secrets.token_hex(20)
@@ -41,8 +30,16 @@ async def registration(user_info: User):
     user_info["trial_start_date"] = datetime.now()
     user_info["trial_end_date"] = datetime.now() + timedelta(days=7)
 
-    new_user = await db["users"].insert_one(user_info)
-    created_user = await db["users"].find_one({"_id": new_user.inserted_id})
+    # the unique indexes on name and email reject duplicates atomically
+    try:
+        await db["users"].insert_one(user_info)
+    except DuplicateKeyError as e:
+        duplicate_fields = (e.details or {}).get("keyPattern") or (e.details or {}).get("keyValue") or {}
+        if "email" in duplicate_fields or "unique_email" in str(e):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="There already is a user by that email")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="There already is a user by that name")
 
     # send email
     await send_registration_mail("Registration successful", user_info["email"],
@@ -54,7 +51,7 @@ async def registration(user_info: User):
         }
     )
 
-    return created_user
+    return user_info
 
 
 @router.post("/details", response_description="Get user details", response_model=UserResponse)
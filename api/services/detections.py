@@ -0,0 +1,58 @@
+"""
+Compact forms of count detections: integer boxes for clients, and a packed binary array stored with
+each object_counts record so the annotated image can be re-rendered later without re-running the models.
+"""
+import numpy as np
+
+# One stored detection: box in the uploaded image's pixels, class id and confidence (11 bytes)
+PACKED_DETECTION_DTYPE = np.dtype([("box", "<u2", (4,)), ("class_id", "u1"), ("score", "<f2")])
+PACKED_DETECTIONS_VERSION = 1
+
+
+def to_upload_detections(detections, scale: float = 1.0, origin=(0, 0)) -> np.ndarray:
+    """
+    Copy of the (N, 6) detections with the boxes in the uploaded image's pixel coordinates.
+
+    `scale` is the counted image's size relative to the image it was decoded from, and `origin` the
+    top-left corner of that image in the upload (the segmentation crop's offset).
+    """
+    upload = np.array(detections, dtype=np.float32).reshape(-1, 6)
+    x0, y0 = origin
+    upload[:, :4] = upload[:, :4] / scale + np.array([x0, y0, x0, y0], dtype=np.float32)
+    return upload
+
+
+def to_upload_boxes(detections, scale: float = 1.0, origin=(0, 0)) -> list:
+    """
+    [x1, y1, x2, y2, class_id] integer rows in the uploaded image's pixel coordinates.
+    """
+    if not len(detections):
+        return []
+    upload = to_upload_detections(detections, scale, origin)
+    return np.hstack([np.rint(upload[:, :4]), upload[:, 5:6]]).astype(int).tolist()
+
+
+def pack_detections(detections, scale: float = 1.0, origin=(0, 0)) -> dict:
+    """
+    Detections in upload coordinates as a document for an object_counts record.
+    """
+    upload = to_upload_detections(detections, scale, origin)
+    packed = np.empty(len(upload), dtype=PACKED_DETECTION_DTYPE)
+    packed["box"] = np.clip(np.rint(upload[:, :4]), 0, np.iinfo(np.uint16).max)
+    packed["class_id"] = upload[:, 5]
+    packed["score"] = upload[:, 4]
+    return {"version": PACKED_DETECTIONS_VERSION, "data": packed.tobytes()}
+
+
+def unpack_detections(document: dict) -> np.ndarray:
+    """
+    (N, 6) float32 [x1, y1, x2, y2, confidence, class_id] array from a pack_detections document.
+    """
+    if document.get("version") != PACKED_DETECTIONS_VERSION:
+        raise ValueError(f"Unsupported packed detections version: {document.get('version')}")
+    packed = np.frombuffer(document["data"], dtype=PACKED_DETECTION_DTYPE)
+    return np.hstack([
+        packed["box"].astype(np.float32),
+        packed["score"].astype(np.float32)[:, None],
+        packed["class_id"].astype(np.float32)[:, None],
+    ])
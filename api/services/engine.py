@@ -0,0 +1,171 @@
+"""
+Count engine shared by every counting service.
+
+Runs one pipeline for any ServiceProfile: segment the pipe region (or crop a client ROI), decode and
+tile the region (preprocess; a tiled image's patches go to the model in one batched predict call),
+detect, suppress overlaps, count and draw. Models are loaded lazily through the registry, so
+importing the engine (e.g. from the post-processing benchmarks) does not need the weights. The count
+routes (api/routes/count.py) add the result cache, uploads and instrumentation around it.
+"""
+import functools
+
+import cv2
+import numpy as np
+import torch
+from torchvision.ops import nms
+
+from api.core.debug_artifacts import save_debug_artifact
+from api.core.metrics import stage_timer
+from api.services.models import get_model, get_yolov5_model, model_version
+from api.services.preprocess import detect, load_image
+from api.services.profiles import ServiceProfile
+from api.services.segmentation import get_pipe_segmentation_model, segment_and_detect
+
+# Per-class circle colours of the "classes" render style, keyed by class name
+CLASS_COLORS = {
+    '1': (255, 255, 255),  # White
+    '2': (0, 255, 0),  # Green
+    '3': (0, 0, 255),  # Red
+    '4': (255, 255, 0),  # Cyan
+    '5': (255, 0, 255),  # Magenta
+    '6': (0, 255, 255),  # Yellow
+}
+
+# Render style -> (total text, position, font scale, colour, line type)
+RENDER_LABELS = {
+    "dots": ("Count: {}", (10, 20), 0.7, (255, 255, 255), cv2.LINE_8),
+    "bars": ("Total: {}", (20, 20), 0.7, (225, 0, 255), cv2.LINE_8),
+    "classes": ("{}", (10, 30), 1, (0, 0, 0), cv2.LINE_AA),
+}
+
+
+def get_counting_model(profile: ServiceProfile):
+    # Loaded on first use and shared by the process
+    if profile.model_format == "yolov5":
+        model = get_yolov5_model(profile.model_path)
+        # YOLOv5 hub models take their thresholds as attributes rather than predict arguments
+        model.model.conf = profile.conf
+        model.model.max_det = profile.max_det
+        return model
+    return get_model(profile.model_path)
+
+
+def profile_model_version(profile: ServiceProfile) -> str:
+    """
+    Version of the models behind a profile's results, for the result cache.
+    """
+    models = [get_counting_model(profile)]
+    if profile.segment:
+        models.insert(0, get_pipe_segmentation_model())
+    return model_version(*models)
+
+
+def filter_overlapping_boxes(detections, iou_threshold):
+    """
+    Apply NMS to an (N, 6) [x1, y1, x2, y2, confidence, class_id] array and return the surviving rows,
+    in descending confidence order.
+    """
+    boxes_tensor = torch.from_numpy(np.ascontiguousarray(detections[:, :4], dtype=np.float32))
+    scores_tensor = torch.from_numpy(np.ascontiguousarray(detections[:, 4], dtype=np.float32))
+    keep_indices = nms(boxes_tensor, scores_tensor, iou_threshold)
+    return detections[keep_indices.numpy()]
+
+
+def detect_objects(profile: ServiceProfile, base64_image):
+    """
+    Decode the image and detect objects in it. Returns the decoded image (None if it couldn't be
+    decoded), the detections as an (N, 6) [x1, y1, x2, y2, confidence, class_id] array in that image's
+    coordinates, and the image's scale relative to the upload.
+    """
+    with stage_timer("model_load"):
+        model = get_counting_model(profile)
+
+    # Decode the base64 image to a numpy array, downscaled or tiled for this service
+    with stage_timer("decode"):
+        img, scale = load_image(base64_image, profile.preprocess)
+    if img is None:
+        return None, np.empty((0, 6), np.float32), 1.0
+
+    predict_kwargs = {} if profile.model_format == "yolov5" else {"conf": profile.conf, "max_det": profile.max_det}
+    with stage_timer("counting_predict"):
+        detections = detect(model, img, profile.preprocess, **predict_kwargs)
+
+    if profile.iou is not None:
+        with stage_timer("postprocess"):
+            detections = filter_overlapping_boxes(detections, profile.iou)
+
+    return img, detections, scale
+
+
+def run_count(profile: ServiceProfile, base64_image, roi=None):
+    """
+    Segment (or crop `roi`) and detect. Returns the image, detections and scale from detect_objects
+    plus the crop's top-left corner in the upload.
+
+    Blocking; the count routes run it on a worker thread.
+    """
+    detect_region = functools.partial(detect_objects, profile)
+    if profile.segment or roi is not None:
+        return segment_and_detect(base64_image, detect_region, roi)
+    return (*detect_region(base64_image), (0, 0))
+
+
+def count_detections(profile: ServiceProfile, detections) -> int:
+    if profile.class_weighted:
+        # Class IDs are 0-based; each detection counts as class_id + 1 objects
+        return int(detections[:, 5].astype(int).sum()) + len(detections)
+    return len(detections)
+
+
+def draw_dots(img, detections):
+    """
+    Draw a green dot at the centre of each box.
+    """
+    for x1, y1, x2, y2 in detections[:, :4].astype(int):
+        cv2.circle(img, (int((x1 + x2) / 2), int((y1 + y2) / 2)), 8, (0, 255, 0), -1)
+
+
+def draw_bars(img, detections):
+    """
+    Draw a filled white circle on each box, sized to it.
+    """
+    for x1, y1, x2, y2 in detections[:, :4].astype(int):
+        radius = int(max(x2 - x1, y2 - y1) * 0.15)
+        cv2.circle(img, (int((x1 + x2) / 2), int((y1 + y2) / 2)), radius=radius, color=(255, 255, 255), thickness=-2)
+
+
+def draw_class_circles(image_rgb, detections, class_names):
+    """
+    Draw a circle around each box in its class's colour.
+    """
+    for xmin, ymin, xmax, ymax, _, class_id in detections:
+        color = CLASS_COLORS.get(str(int(class_names[int(class_id)])), (255, 255, 255))
+        center = (int((xmin + xmax) / 2), int((ymin + ymax) / 2))
+        cv2.circle(image_rgb, center, int((xmax - xmin) / 4), color, 2)
+
+
+def render_detections(profile: ServiceProfile, img, detections, total=None):
+    """
+    Mark the detections and the total on the image and return it. `total` overrides the printed
+    count, e.g. with a manually corrected one.
+
+    Draws in place, except for the "classes" style, which draws on an RGB copy.
+    """
+    if total is None:
+        total = count_detections(profile, detections)
+
+    with stage_timer("annotate"):
+        if profile.render_style == "classes":
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            draw_class_circles(img, detections, get_counting_model(profile).names)
+        elif profile.render_style == "bars":
+            draw_bars(img, detections)
+        else:
+            draw_dots(img, detections)
+
+        text, position, font_scale, color, line_type = RENDER_LABELS[profile.render_style]
+        cv2.putText(img, text.format(total), position, cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, 2, line_type)
+
+    # Keep a copy of the annotated image when debug artifacts are enabled
+    save_debug_artifact(f"{profile.name}_annotated", img)
+    return img
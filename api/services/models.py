@@ -0,0 +1,266 @@
+"""
+Model registry for the count services.
+
+Services get their YOLO models from here instead of constructing them per request. Each model is
+loaded once per process and, depending on MODEL_RUNTIME, served from an exported ONNX Runtime or
+OpenVINO artifact instead of the eager PyTorch weights. Exported artifacts are cached under
+MODEL_EXPORT_DIR, keyed by a hash of the source weights, so they are only rebuilt when the weights
+change. Export them ahead of a deploy so the first request doesn't pay for it:
+
+    MODEL_RUNTIME=onnx python -m api.services.models
+"""
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import torch
+from ultralytics import YOLO
+
+from api.config import settings
+
+# Logging configuration
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DIR = "api/artifacts"
+# Legacy YOLOv5 checkpoints: loaded with get_yolov5_model and never exported
+YOLOV5_WEIGHTS = {"api/artifacts/PVCPipeDetection/telescopic.pt"}
+RUNTIMES = ("pytorch", "onnx", "openvino")
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class RegisteredModel:
+    """
+    A loaded model plus what it was built from. The ultralytics predictor is not thread-safe, so
+    predictions on one model are serialised.
+    """
+
+    def __init__(self, model, source_path: str, runtime: str, digest: str):
+        self.model = model
+        self.source_path = source_path
+        self.runtime = runtime
+        self.digest = digest
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        return self.model.names
+
+    @property
+    def version(self) -> str:
+        # Results depend on the weights and, slightly, on the runtime they were exported to
+        return f"{self.digest}-{self.runtime}"
+
+    def predict(self, *args, **kwargs):
+        with self._lock:
+            return self.model.predict(*args, **kwargs)
+
+    def detect(self, images, **kwargs):
+        """
+        One (N, 6) array of [x1, y1, x2, y2, confidence, class_id] rows per image.
+        """
+        results = self.predict(images, **kwargs)
+        return [result.boxes.data[:, :6].cpu().numpy() for result in results]
+
+
+class YOLOv5Model(RegisteredModel):
+    """
+    A legacy YOLOv5 (torch.hub AutoShape) model; it is called directly rather than through `predict`.
+    """
+
+    def predict(self, *args, **kwargs):
+        with self._lock:
+            return self.model(*args, **kwargs)
+
+    def detect(self, images, **kwargs):
+        results = self.predict(images, **kwargs)
+        return [xyxy.cpu().numpy() for xyxy in results.xyxy]
+
+
+def file_digest(path: str) -> str:
+    """
+    Short sha256 of a weights file, used to key exported artifacts.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:16]
+
+
+def exported_path(source_path: str, runtime: str, digest: str) -> str:
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    precision = "int8" if settings.MODEL_INT8 else "fp32"
+    # ultralytics picks the backend from these suffixes
+    suffix = ".onnx" if runtime == "onnx" else "_openvino_model"
+    # "dynamic": exports from before dynamic batching were batch-1 and must not be reused
+    return os.path.join(
+        settings.MODEL_EXPORT_DIR, f"{name}-{digest}-{settings.MODEL_IMGSZ}-{precision}-dynamic{suffix}"
+    )
+
+
+def quantize_onnx(path: str) -> str:
+    """
+    Dynamic INT8 weight quantization; needs no calibration data.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized = path[: -len(".onnx")] + "-int8.onnx"
+    quantize_dynamic(path, quantized, weight_type=QuantType.QUInt8)
+    return quantized
+
+
+def export_model(source_path: str, runtime: str, target: str):
+    """
+    Export `source_path` for `runtime` and move the result to `target`.
+
+    ultralytics writes exports next to the weights, so the export runs on a private copy; that way
+    concurrent workers exporting the same model never see each other's half-written files.
+    """
+    os.makedirs(settings.MODEL_EXPORT_DIR, exist_ok=True)
+    workdir = tempfile.mkdtemp(dir=settings.MODEL_EXPORT_DIR)
+    try:
+        staged = shutil.copy2(source_path, workdir)
+        # Dynamic batch: tiled images send all their tiles to the model in one call
+        options = {"format": runtime, "imgsz": settings.MODEL_IMGSZ, "dynamic": True}
+        if runtime == "openvino" and settings.MODEL_INT8:
+            options["int8"] = True
+            if settings.MODEL_CALIBRATION_DATA:
+                options["data"] = settings.MODEL_CALIBRATION_DATA
+        exported = YOLO(staged).export(**options)
+        if runtime == "onnx" and settings.MODEL_INT8:
+            exported = quantize_onnx(exported)
+        try:
+            os.replace(exported, target)
+        except OSError:
+            # Another worker finished first
+            if not os.path.exists(target):
+                raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def load_model(path: str, task: str = None, runtime: str = None) -> RegisteredModel:
+    """
+    Load `path` for the configured runtime, exporting it first if there is no cached artifact.
+
+    Falls back to the PyTorch weights if the export or the runtime is unavailable, so a missing
+    optional dependency degrades performance rather than the service.
+    """
+    runtime = runtime or settings.MODEL_RUNTIME
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown MODEL_RUNTIME {runtime!r}, expected one of {RUNTIMES}")
+    digest = file_digest(path)
+
+    if runtime != "pytorch":
+        target = exported_path(path, runtime, digest)
+        try:
+            if not os.path.exists(target):
+                logger.info(f"Exporting {path} for {runtime} to {target}")
+                export_model(path, runtime, target)
+            # Exported artifacts don't reliably record their task, so take it from the weights
+            task = task or YOLO(path).task
+            model = RegisteredModel(YOLO(target, task=task), path, runtime, digest)
+            logger.info(f"Loaded {path} with {runtime} from {target}")
+            return model
+        except Exception as e:
+            logger.error(f"Could not load {path} with {runtime}, falling back to PyTorch: {e}")
+
+    model = RegisteredModel(YOLO(path, task=task), path, "pytorch", digest)
+    logger.info(f"Loaded {path} with pytorch")
+    return model
+
+
+def load_yolov5_model(path: str) -> YOLOv5Model:
+    """
+    Load a YOLOv5 checkpoint with the yolov5 code from a local checkout, without touching the network.
+
+    YOLOv5 checkpoints pickle classes from the yolov5 repo, so they can't be loaded by ultralytics or
+    exported; they always run on PyTorch. The code comes from YOLOV5_REPO_DIR (the docker image clones
+    a pinned release there), or the torch.hub cache left by an earlier download. If neither exists
+    this raises rather than downloading the repo.
+    """
+    if settings.MODEL_RUNTIME != "pytorch":
+        logger.info(f"{path} is a YOLOv5 checkpoint and runs on pytorch regardless of MODEL_RUNTIME")
+    repo_dir = settings.YOLOV5_REPO_DIR or os.path.join(torch.hub.get_dir(), "ultralytics_yolov5_master")
+    if not os.path.isfile(os.path.join(repo_dir, "hubconf.py")):
+        raise RuntimeError(
+            f"No yolov5 code at {repo_dir}, needed to load {path}. Clone ultralytics/yolov5 "
+            f"(git clone --depth 1 --branch v7.0 https://github.com/ultralytics/yolov5) and set YOLOV5_REPO_DIR to it."
+        )
+    model = torch.hub.load(repo_dir, "custom", path=path, source="local")
+    logger.info(f"Loaded {path} with pytorch (yolov5)")
+    return YOLOv5Model(model, path, "pytorch", file_digest(path))
+
+
+def _get_or_load(key, loader):
+    model = _registry.get(key)
+    if model is None:
+        with _registry_lock:
+            model = _registry.get(key)
+            if model is None:
+                model = _registry[key] = loader()
+    return model
+
+
+def model_version(*models: RegisteredModel) -> str:
+    """
+    Identifier of the models behind a result; changes whenever any of their weights do.
+    """
+    return "+".join(model.version for model in models)
+
+
+def get_model(path: str, task: str = None) -> RegisteredModel:
+    """
+    The process-wide model for `path`, loaded on first use.
+    """
+    return _get_or_load((path, task), lambda: load_model(path, task))
+
+
+def get_yolov5_model(path: str) -> YOLOv5Model:
+    """
+    The process-wide YOLOv5 model for `path`, loaded on first use.
+    """
+    return _get_or_load((path, "yolov5"), lambda: load_yolov5_model(path))
+
+
+def export_all(artifacts_dir: str = ARTIFACTS_DIR, runtime: str = None) -> int:
+    """
+    Export every .pt under `artifacts_dir` for the configured runtime. Returns the number of failures.
+    """
+    runtime = runtime or settings.MODEL_RUNTIME
+    if runtime == "pytorch":
+        logger.info("MODEL_RUNTIME is pytorch, nothing to export")
+        return 0
+    failures = 0
+    for root, _, files in os.walk(artifacts_dir):
+        for name in sorted(files):
+            if not name.endswith(".pt"):
+                continue
+            path = os.path.join(root, name)
+            if os.path.normpath(path) in {os.path.normpath(weights) for weights in YOLOV5_WEIGHTS}:
+                logger.info(f"Skipping {path}: YOLOv5 checkpoints run on pytorch")
+                continue
+            target = exported_path(path, runtime, file_digest(path))
+            if os.path.exists(target):
+                logger.info(f"{path} already exported to {target}")
+                continue
+            try:
+                export_model(path, runtime, target)
+                logger.info(f"Exported {path} to {target}")
+            except Exception as e:
+                failures += 1
+                logger.error(f"Failed to export {path}: {e}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if export_all() else 0)
@@ -0,0 +1,136 @@
+"""
+Image preprocessing for the count services: early downscaling and tiling of large uploads.
+
+Phone photos of pipe bundles are often 12 MP or more, while the detectors run at 640px. Decoding,
+annotating and encoding them at full resolution costs far more than the detector needs, so by default
+inputs are downscaled to `max_side` while decoding: JPEGs are decoded straight at 1/2, 1/4 or 1/8
+scale by libjpeg, and only the remainder is resized.
+
+For very dense, large images, downscaling loses small objects, so a service can instead cut the image
+into overlapping `tile_size` patches, detect on each and merge the detections. Each service declares
+its own PREPROCESS config.
+"""
+import base64
+import io
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+from pydantic import BaseModel
+from torchvision.ops import nms
+
+
+class PreprocessConfig(BaseModel):
+    max_side: int = 1920  # downscale inputs with a longer side than this; 0 keeps full resolution
+    tile_size: int = 0  # tile inputs larger than tile_min_side into patches this big; 0 never tiles
+    tile_overlap: int = 160  # must exceed the largest object, or objects on tile seams are lost
+    tile_min_side: int = 3000
+    tile_max_side: int = 4096  # resolution cap for tiled inputs
+    merge_iou: float = 0.5  # NMS threshold for duplicates from overlapping tiles
+
+
+# Reduction factor -> decode flag; libjpeg scales while decoding, other formats are resized after
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+# Boxes this close to a tile edge that is not an image edge are clipped; the neighbouring tile sees them whole
+TILE_EDGE_MARGIN = 2
+
+
+def image_size(data: bytes):
+    """
+    (width, height) from the image header, without decoding the pixels. None if unreadable.
+    """
+    try:
+        return Image.open(io.BytesIO(data)).size
+    except Exception:
+        return None
+
+
+def decode_image(data: bytes, max_side: int = 0):
+    """
+    Decode image bytes to BGR, downscaled so the longer side is at most `max_side`.
+    """
+    flag = cv2.IMREAD_COLOR
+    size = image_size(data)
+    if max_side and size and max(size) > max_side:
+        for factor, reduced_flag in REDUCED_DECODE_FLAGS.items():
+            if max(size) / factor >= max_side:
+                flag = reduced_flag
+                break
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if img is not None and max_side and max(img.shape[:2]) > max_side:
+        scale = max_side / max(img.shape[:2])
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def should_tile(width: int, height: int, config: PreprocessConfig) -> bool:
+    return bool(config.tile_size) and max(width, height) > config.tile_min_side
+
+
+def load_image(base64_image: str, config: PreprocessConfig):
+    """
+    Decode a base64 upload at the resolution `config` asks for: capped at `tile_max_side` if it is
+    going to be tiled, otherwise at `max_side`.
+
+    Returns the image (None if it can't be decoded) and its scale relative to the upload, so
+    detections can be mapped back to the uploaded image's pixels.
+    """
+    data = base64.b64decode(base64_image)
+    size = image_size(data)
+    max_side = config.tile_max_side if size and should_tile(*size, config) else config.max_side
+    img = decode_image(data, max_side)
+    if img is None or not size:
+        return img, 1.0
+    return img, max(img.shape[:2]) / max(size)
+
+
+def tile_origins(length: int, tile_size: int, overlap: int):
+    """
+    Start offsets of overlapping tiles covering [0, length).
+    """
+    if length <= tile_size:
+        return [0]
+    origins = list(range(0, length - tile_size, tile_size - overlap))
+    origins.append(length - tile_size)
+    return origins
+
+
+def detect(model, img, config: PreprocessConfig, **predict_kwargs) -> np.ndarray:
+    """
+    Detections for `img` as an (N, 6) array of [x1, y1, x2, y2, confidence, class_id] rows, tiling
+    the image if `config` calls for it.
+    """
+    height, width = img.shape[:2]
+    if not should_tile(width, height, config):
+        return model.detect([img], **predict_kwargs)[0]
+
+    origins = [
+        (x0, y0)
+        for y0 in tile_origins(height, config.tile_size, config.tile_overlap)
+        for x0 in tile_origins(width, config.tile_size, config.tile_overlap)
+    ]
+    tiles = [img[y0:y0 + config.tile_size, x0:x0 + config.tile_size] for x0, y0 in origins]
+    merged = []
+    for (x0, y0), tile, detections in zip(origins, tiles, model.detect(tiles, **predict_kwargs)):
+        tile_height, tile_width = tile.shape[:2]
+        x1, y1, x2, y2 = detections[:, 0], detections[:, 1], detections[:, 2], detections[:, 3]
+        clipped = (
+            ((x1 < TILE_EDGE_MARGIN) & (x0 > 0))
+            | ((y1 < TILE_EDGE_MARGIN) & (y0 > 0))
+            | ((x2 > tile_width - TILE_EDGE_MARGIN) & (x0 + tile_width < width))
+            | ((y2 > tile_height - TILE_EDGE_MARGIN) & (y0 + tile_height < height))
+        )
+        detections = detections[~clipped].copy()
+        detections[:, [0, 2]] += x0
+        detections[:, [1, 3]] += y0
+        merged.append(detections)
+
+    detections = np.concatenate(merged).astype(np.float32)
+    keep = nms(torch.from_numpy(detections[:, :4]), torch.from_numpy(detections[:, 4]), config.merge_iou)
+    return detections[keep.numpy()]
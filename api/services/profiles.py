@@ -0,0 +1,75 @@
+"""
+Declarative profiles of the counting services.
+
+Everything that differs between the services lives here; the count engine (api/services/engine.py)
+runs the same pipeline for all of them and the count routes are generated from COUNT_PROFILES. A new
+counting service is a new profile, not a new service module and router.
+"""
+from typing import Optional
+
+from pydantic import BaseModel
+
+from api.services.preprocess import PreprocessConfig
+
+MODEL_FORMATS = ("ultralytics", "yolov5")
+RENDER_STYLES = ("dots", "bars", "classes")
+
+
+class ServiceProfile(BaseModel):
+    name: str  # route path, object_counts category and metrics label
+    label: str  # how the service is named in messages
+    model_path: str
+    model_format: str = "ultralytics"  # "yolov5" for legacy torch.hub checkpoints
+    conf: float = 0.3
+    max_det: int = 300
+    iou: Optional[float] = None  # extra class-agnostic NMS on the detections; None keeps the model's own
+    class_weighted: bool = False  # a detection of class_id k counts as k + 1 objects (bundled classes)
+    segment: bool = True  # crop to the segmented pipe region before detecting
+    render_style: str = "dots"  # "dots", "bars" or "classes"
+    preprocess: PreprocessConfig = PreprocessConfig()
+
+
+COUNT_PROFILES = (
+    ServiceProfile(
+        name="nonTelescopicPVCPipes",
+        label="NonTelescopicPipe",
+        model_path="api/artifacts/PVCPipeDetection/nonTelescopic.pt",
+    ),
+    ServiceProfile(
+        name="telescopicPVCPipes",
+        label="telescopic",
+        model_path="api/artifacts/PVCPipeDetection/telescopic.pt",
+        model_format="yolov5",
+        conf=0.25,
+        max_det=3000,
+        iou=0.2,
+        class_weighted=True,
+        render_style="classes",
+    ),
+    ServiceProfile(
+        name="mildSteelBars",
+        label="mildSteelBars",
+        model_path="api/artifacts/metalBars/mild_metal_bars.pt",
+        max_det=700,
+        iou=0.1,
+        class_weighted=True,
+        render_style="bars",
+        # Bar bundles are the densest inputs, so large photos are tiled rather than downscaled
+        preprocess=PreprocessConfig(tile_size=1280),
+    ),
+    ServiceProfile(
+        name="metalSqaurePipe",
+        label="metalSquarePipe",
+        model_path="api/artifacts/metalSquarePipe/metalSquarePipe.pt",
+    ),
+    ServiceProfile(
+        name="woodLogs",
+        label="woodLogs",
+        model_path="api/artifacts/WoodLogs/woodLogs.pt",
+    ),
+)
+
+PROFILES = {profile.name: profile for profile in COUNT_PROFILES}
+
+# object_counts category -> profile; testServe counts bars through its own work-order route
+CATEGORY_PROFILES = {**PROFILES, "testServe": PROFILES["mildSteelBars"]}
@@ -0,0 +1,165 @@
+"""
+Pipe-region segmentation shared by the count services.
+
+The segmentation model only has to find one region and runs at 640px, so it gets a reduced-resolution
+decode of the upload (libjpeg decodes straight at 1/2, 1/4 or 1/8 scale). The region is mapped back
+to full-resolution coordinates and only the crop is taken from the full-resolution image, which is
+not decoded at all when nothing is found.
+
+Only the region's bounding box is used, so by default (SEGMENTATION_BOX_ONLY) the model runs with
+BoxOnlySegmentationPredictor: it reads just the box and class columns of the segment head's output
+and keeps the highest-confidence region, without NMS over the other candidates and without building
+masks from the prototypes. Requests that come with a region of interest skip the model altogether
+(crop_roi).
+"""
+import base64
+import logging
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+from ultralytics.models.yolo.segment import SegmentationPredictor
+from ultralytics.utils import ops
+
+from api.config import settings
+from api.core.metrics import stage_timer
+from api.services.models import get_model
+from api.services.preprocess import decode_image
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEGMENTATION_MODEL_PATH = "api/artifacts/Segmentation/PipeSegmentation.pt"
+# Longest side of the image the segmentation model sees: twice its input size
+SEGMENTATION_MAX_SIDE = 1280
+
+
+class BoxOnlySegmentationPredictor(SegmentationPredictor):
+    """
+    Segmentation predictor that returns only the highest-confidence box of each image, with no masks.
+
+    The segment head's output is (batch, 4 + classes + 32 mask coefficients, anchors). Only the box
+    and class columns are read; the mask coefficients and prototypes are never touched. The single
+    best box is by definition kept by NMS, so NMS is skipped too.
+    """
+
+    def postprocess(self, preds, img, orig_imgs):
+        output = preds[0] if isinstance(preds, (list, tuple)) else preds
+        num_classes = len(self.model.names)
+        if not isinstance(orig_imgs, list):
+            orig_imgs = ops.convert_torch2numpy_batch(orig_imgs)
+
+        results = []
+        for prediction, orig_img, img_path in zip(output, orig_imgs, self.batch[0]):
+            scores, classes = prediction[4:4 + num_classes].max(0)
+            best = scores.argmax()
+            boxes = torch.zeros((0, 6), device=prediction.device)
+            if scores[best] >= self.args.conf:
+                box = ops.scale_boxes(img.shape[2:], ops.xywh2xyxy(prediction[:4, best][None]), orig_img.shape)
+                boxes = torch.cat([box, scores[best].view(1, 1), classes[best].view(1, 1).float()], 1)
+            results.append(Results(orig_img, path=img_path, names=self.model.names, boxes=boxes))
+        return results
+
+
+# Load the segmentation model on first use, so importing the services (e.g. from the
+# post-processing benchmarks) does not need the weights
+def get_pipe_segmentation_model():
+    return get_model(SEGMENTATION_MODEL_PATH, task="segment")
+
+
+def get_segmented_pipes(base64_image):
+    """
+    Segment the main pipe region and return it as a base64 JPEG crop of the full-resolution image,
+    or None if no region was found.
+    """
+    return segment_pipes(base64_image)[0]
+
+
+def segment_pipes(base64_image):
+    """
+    Like get_segmented_pipes, but also returns the crop's top-left corner in the upload, (0, 0) when
+    nothing was cropped.
+    """
+    # Decode at reduced resolution for the segmentation pass
+    with stage_timer("decode"):
+        image_data = base64.b64decode(base64_image)
+        small = decode_image(image_data, SEGMENTATION_MAX_SIDE)
+    if small is None:
+        return None, (0, 0)
+
+    # Perform prediction
+    pipe_segmentation_model = get_pipe_segmentation_model()
+    with stage_timer("segmentation_predict"):
+        # One region is all the crop needs: keep the highest-confidence one
+        if settings.SEGMENTATION_BOX_ONLY:
+            results = pipe_segmentation_model.predict(small, max_det=1, predictor=BoxOnlySegmentationPredictor)
+        else:
+            results = pipe_segmentation_model.predict(small, max_det=1)
+
+    if not len(results[0].boxes):
+        return None, (0, 0)
+    x, y, w, h = results[0].boxes.xywh[0].tolist()
+
+    # Full-resolution decode, only needed for the crop
+    with stage_timer("decode"):
+        im0 = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    scale_x = im0.shape[1] / small.shape[1]
+    scale_y = im0.shape[0] / small.shape[0]
+
+    # Crop the bounding box region, mapped back to full resolution, with a 1-pixel margin
+    x, y, w, h = x * scale_x, y * scale_y, w * scale_x, h * scale_y
+    margin = 1
+    x1, y1 = int(x - w / 2 - margin), int(y - h / 2 - margin)
+    x2, y2 = int(x + w / 2 + margin), int(y + h / 2 + margin)
+
+    # Ensure coordinates are within image boundaries
+    x1, y1 = max(x1, 0), max(y1, 0)
+    x2, y2 = min(x2, im0.shape[1]), min(y2, im0.shape[0])
+
+    cropped_image = im0[y1:y2, x1:x2]
+
+    # Convert the cropped image to base64
+    with stage_timer("encode"):
+        _, buffer = cv2.imencode('.jpg', cropped_image)
+        cropped_base64 = base64.b64encode(buffer).decode('utf-8')
+
+    return cropped_base64, (x1, y1)
+
+
+def crop_roi(base64_image, roi):
+    """
+    Crop a client-supplied region of interest, in upload pixels, instead of segmenting. Returns the
+    same as segment_pipes; (None, (0, 0)) if the ROI lies outside the image.
+    """
+    with stage_timer("decode"):
+        im0 = cv2.imdecode(np.frombuffer(base64.b64decode(base64_image), np.uint8), cv2.IMREAD_COLOR)
+    if im0 is None:
+        return None, (0, 0)
+
+    x1, y1 = min(roi.x1, im0.shape[1]), min(roi.y1, im0.shape[0])
+    x2, y2 = min(roi.x2, im0.shape[1]), min(roi.y2, im0.shape[0])
+    if x2 <= x1 or y2 <= y1:
+        logger.warning(f"ROI {roi} is outside the {im0.shape[1]}x{im0.shape[0]} image, counting the whole image")
+        return None, (0, 0)
+
+    with stage_timer("encode"):
+        _, buffer = cv2.imencode('.jpg', im0[y1:y2, x1:x2])
+        cropped_base64 = base64.b64encode(buffer).decode('utf-8')
+    return cropped_base64, (x1, y1)
+
+
+def segment_and_detect(base64_image, detect_objects, roi=None):
+    """
+    Segment the pipe region, or crop `roi` if one is given, and run a service's `detect_objects` on
+    it, or on the whole upload if no region was found. Returns what `detect_objects` does (image,
+    detections, scale) plus the crop's top-left corner in the upload.
+
+    Blocking; the count routes run it on a worker thread.
+    """
+    if roi is not None:
+        segmented_base64, crop_origin = crop_roi(base64_image, roi)
+    else:
+        segmented_base64, crop_origin = segment_pipes(base64_image)
+    img, detections, scale = detect_objects(segmented_base64 or base64_image)
+    return img, detections, scale, crop_origin
@@ -0,0 +1,169 @@
+"""
+Micro-benchmarks for the per-detection post-processing in the count engine: NMS and drawing.
+
+Feeds synthetic detections of increasing density straight into the engine functions for each service
+profile (no model, no server, no weights), times each call, and fits how the cost scales with the
+number of boxes:
+
+    python benchmarks/bench_postprocess.py --sizes 10,100,1000,3000
+    python benchmarks/bench_postprocess.py --only telescopicPVCPipes --max-exponent 1.3
+
+A scaling exponent near 1 is linear in the number of boxes; anything clearly above that means a
+per-detection loop has gone quadratic. Reports are written as kind "micro" and can be diffed with
+compare.py like the load-test reports.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+from stats import report_metadata, summarize, write_report  # noqa: E402
+
+# The service modules import api.config, which needs a full set of settings
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(os.path.join(BENCHMARKS_DIR, "benchmark.env"))
+
+from api.services import engine  # noqa: E402
+from api.services.profiles import COUNT_PROFILES  # noqa: E402
+
+DEFAULT_SIZES = "10,30,100,300,1000,3000"
+# Stand-in for the telescopic model's class names, which the "classes" style colours by
+CLASS_NAMES = {class_id: str(class_id + 1) for class_id in range(6)}
+
+
+def synthetic_detections(count: int, width: int, height: int, num_classes: int, seed: int = 0) -> np.ndarray:
+    """
+    (count, 6) float32 array of [x1, y1, x2, y2, confidence, class_id] rows.
+
+    Box sizes are in the range of pipe ends in a 1280x960 photo, so dense inputs overlap and NMS has
+    real work to do.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = rng.uniform(15, 60, size=(count, 1))
+    x1 = rng.uniform(0, width - 60, size=(count, 1))
+    y1 = rng.uniform(0, height - 60, size=(count, 1))
+    confidence = rng.uniform(0.25, 1.0, size=(count, 1))
+    class_id = rng.integers(0, num_classes, size=(count, 1))
+    return np.hstack([x1, y1, x1 + sizes, y1 + sizes, confidence, class_id]).astype(np.float32)
+
+
+def build_cases(width: int, height: int) -> dict:
+    """
+    Benchmark name -> setup(count) returning a zero-argument call, for each profile's NMS (if it has
+    one) and drawing.
+
+    Setup runs outside the timed region, so each call gets its own copy of the image to draw on.
+    """
+    image = np.full((height, width, 3), 90, np.uint8)
+    draw_functions = {
+        "dots": engine.draw_dots,
+        "bars": engine.draw_bars,
+        "classes": lambda canvas, detections: engine.draw_class_circles(canvas, detections, CLASS_NAMES),
+    }
+
+    def nms(profile):
+        def setup(count):
+            detections = synthetic_detections(count, width, height, num_classes=6)
+            return lambda: engine.filter_overlapping_boxes(detections, profile.iou)
+        return setup
+
+    def draw(profile):
+        draw_function = draw_functions[profile.render_style]
+
+        def setup(count):
+            detections = synthetic_detections(count, width, height, num_classes=6)
+            canvas = image.copy()
+            return lambda: draw_function(canvas, detections)
+        return setup
+
+    cases = {}
+    for profile in COUNT_PROFILES:
+        if profile.iou is not None:
+            cases[f"{profile.name}.filter_overlapping_boxes"] = nms(profile)
+        cases[f"{profile.name}.draw"] = draw(profile)
+    return cases
+
+
+def measure(setup, count: int, min_rounds: int, max_rounds: int, max_time: float) -> list:
+    """
+    Time individual calls until both `min_rounds` and `max_time` are reached (or `max_rounds` is hit).
+    """
+    setup(count)()  # warm-up
+    timings = []
+    deadline = time.perf_counter() + max_time
+    while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() < deadline):
+        call = setup(count)
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def scaling_exponent(sizes, latencies) -> float:
+    """
+    Least-squares slope of log(latency) against log(boxes): ~1 is linear, ~2 quadratic.
+    """
+    points = [(math.log(size), math.log(latency)) for size, latency in zip(sizes, latencies) if latency > 0]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def main(args):
+    sizes = [int(size) for size in args.sizes.split(",")]
+    cases = {name: setup for name, setup in build_cases(args.width, args.height).items() if args.only in name}
+
+    results, scaling = [], {}
+    for name, setup in cases.items():
+        medians = []
+        for count in sizes:
+            timings = measure(setup, count, args.min_rounds, args.max_rounds, args.max_time)
+            latency = summarize(timings)
+            medians.append(latency["p50"])
+            results.append({"function": name, "boxes": count, "rounds": len(timings), "latency_ms": latency})
+            print(
+                f"{name:<42} n={count:<5} p50={latency['p50']:9.3f}ms p95={latency['p95']:9.3f}ms "
+                f"({latency['p50'] * 1000 / count:7.2f} us/box, {len(timings)} rounds)"
+            )
+        scaling[name] = scaling_exponent(sizes, medians)
+        print(f"{name:<42} scaling exponent {scaling[name]:.2f}")
+
+    report = {
+        "meta": report_metadata(kind="micro", sizes=sizes, image=[args.width, args.height]),
+        "results": results,
+        "scaling": scaling,
+    }
+    print(f"Report written to {write_report(report, args.output_dir, 'micro')}")
+
+    if args.max_exponent is not None:
+        superlinear = {name: exponent for name, exponent in scaling.items() if exponent > args.max_exponent}
+        if superlinear:
+            for name, exponent in superlinear.items():
+                print(f"{name} scales as n^{exponent:.2f}, above the allowed n^{args.max_exponent}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated detection counts")
+    parser.add_argument("--only", default="", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--max-time", type=float, default=0.5, help="Seconds spent per function and size")
+    parser.add_argument("--max-exponent", type=float, help="Exit non-zero if any function scales worse than n^X")
+    parser.add_argument("--output-dir", default=os.path.join(BENCHMARKS_DIR, "reports"))
+    main(parser.parse_args())
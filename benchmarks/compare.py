@@ -0,0 +1,67 @@
+"""
+Compare two benchmark reports and flag regressions.
+
+    python benchmarks/compare.py benchmarks/reports/load-abc123-....json benchmarks/reports/load-def456-....json
+
+Exits with status 1 if any tracked latency grew by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+# Report kind -> (key fields identifying a result, latency fields compared, throughput field or None)
+REPORT_KINDS = {
+    "load_test": (("scenario", "concurrency"), ("p50", "p95", "p99"), "throughput_rps"),
+    "micro": (("function", "boxes"), ("p50", "p95"), None),
+}
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(args):
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    kind = baseline["meta"].get("kind")
+    if kind != candidate["meta"].get("kind") or kind not in REPORT_KINDS:
+        sys.exit(f"Cannot compare reports of kind {kind!r} and {candidate['meta'].get('kind')!r}")
+    key_fields, latency_fields, throughput_field = REPORT_KINDS[kind]
+
+    def index(report):
+        return {tuple(result[field] for field in key_fields): result for result in report["results"]}
+
+    baseline_results, candidate_results = index(baseline), index(candidate)
+    print(f"baseline {baseline['meta']['commit']}  vs  candidate {candidate['meta']['commit']}")
+
+    regressions = 0
+    for key, before in baseline_results.items():
+        after = candidate_results.get(key)
+        if after is None:
+            continue
+        cells = []
+        for field in latency_fields:
+            old, new = before["latency_ms"][field], after["latency_ms"][field]
+            change = (new - old) / old * 100 if old else 0.0
+            flag = ""
+            if change > args.threshold:
+                regressions += 1
+                flag = " !"
+            cells.append(f"{field} {old:9.3f} -> {new:9.3f} ms ({change:+6.1f}%){flag}")
+        if throughput_field:
+            old, new = before[throughput_field], after[throughput_field]
+            change = (new - old) / old * 100 if old else 0.0
+            cells.append(f"rps {old:8.1f} -> {new:8.1f} ({change:+6.1f}%)")
+        print(f"{' '.join(str(part) for part in key):<48} " + "  ".join(cells))
+
+    if regressions:
+        print(f"{regressions} latency regressions above {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed latency growth in percent")
+    main(parser.parse_args())
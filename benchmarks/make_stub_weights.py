@@ -0,0 +1,37 @@
+"""
+Write randomly initialised YOLOv8n weights at every path the services load from api/artifacts.
+
+The stub models have the production architecture family and input size, so inference cost is
+representative, but they detect nothing meaningful. Never deploy them.
+
+    python benchmarks/make_stub_weights.py
+"""
+import argparse
+import os
+
+from ultralytics import YOLO
+
+# artifact path -> ultralytics model config
+STUB_MODELS = {
+    "api/artifacts/Segmentation/PipeSegmentation.pt": "yolov8n-seg.yaml",
+    "api/artifacts/PVCPipeDetection/nonTelescopic.pt": "yolov8n.yaml",
+    "api/artifacts/metalBars/mild_metal_bars.pt": "yolov8n.yaml",
+    "api/artifacts/metalSquarePipe/metalSquarePipe.pt": "yolov8n.yaml",
+    "api/artifacts/WoodLogs/woodLogs.pt": "yolov8n.yaml",
+}
+
+
+def main(args):
+    for path, config in STUB_MODELS.items():
+        if os.path.exists(path) and not args.overwrite:
+            print(f"Keeping existing {path}")
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        YOLO(config).save(path)
+        print(f"Wrote stub {config} weights to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--overwrite", action="store_true", help="Replace weights that already exist")
+    main(parser.parse_args())
@@ -0,0 +1,155 @@
+"""
+Load test for the count endpoints, auth and subscription checks.
+
+Runs against a server started with local Mongo, a local S3 stand-in and stub weights (see benchmarks/README.md):
+
+    python benchmarks/run_load.py --base-url http://localhost:8010 --concurrency 1,4,16 --requests 100
+"""
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stats import report_metadata, summarize, write_report  # noqa: E402
+
+COUNT_SERVICES = ["nonTelescopicPVCPipes", "mildSteelBars", "metalSqaurePipe", "woodLogs", "telescopicPVCPipes"]
+DEFAULT_SCENARIOS = ["login", "auth", "subscriptions", "mildSteelBars", "nonTelescopicPVCPipes"]
+
+
+def synthetic_image_base64(width: int = 1280, height: int = 960, objects: int = 200) -> str:
+    """
+    JPEG of random filled circles, roughly the shape of a bundle of pipe ends.
+    """
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    img = np.full((height, width, 3), 90, np.uint8)
+    for _ in range(objects):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(10, 30))
+        cv2.circle(img, center, radius, (200, 200, 200), -1)
+        cv2.circle(img, center, radius // 2, (40, 40, 40), -1)
+    _, buffer = cv2.imencode(".jpg", img)
+    return base64.b64encode(buffer).decode("utf-8")
+
+
+def load_image_base64(path: str) -> str:
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> httpx.Response:
+    return await client.post("/login", data={"username": username, "password": password})
+
+
+def build_scenarios(args, token: str, image_base64: str) -> dict:
+    auth_headers = {"Authorization": f"Bearer {token}"}
+    scenarios = {
+        "login": lambda client: login(client, args.username, args.password),
+        "auth": lambda client: client.post("/users/details", headers=auth_headers),
+        "subscriptions": lambda client: client.get("/subscribe/subscriptions/active", headers=auth_headers),
+    }
+    for service in COUNT_SERVICES:
+        scenarios[service] = lambda client, service=service: client.post(
+            f"/{service}", json={"base64_image": image_base64, "render": True}, headers=auth_headers
+        )
+        # Count only: no annotation, encode or processed-image upload
+        scenarios[f"{service}-lite"] = lambda client, service=service: client.post(
+            f"/{service}", json={"base64_image": image_base64, "render": False}, headers=auth_headers
+        )
+    return scenarios
+
+
+async def run_level(client, request_factory, concurrency: int, total_requests: int) -> dict:
+    """
+    Issue `total_requests` requests from `concurrency` workers and summarise their latencies.
+    """
+    latencies, errors = [], 0
+    remaining = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await request_factory(client)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": total_requests / elapsed if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+    }
+
+
+async def main(args):
+    image_base64 = load_image_base64(args.image) if args.image else synthetic_image_base64()
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=max(concurrency_levels))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits) as client:
+        response = await login(client, args.username, args.password)
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        scenarios = build_scenarios(args, token, image_base64)
+        results = []
+        for name in args.scenarios.split(","):
+            request_factory = scenarios[name]
+            for _ in range(args.warmup):
+                await request_factory(client)
+            for concurrency in concurrency_levels:
+                result = {"scenario": name, **await run_level(client, request_factory, concurrency, args.requests)}
+                results.append(result)
+                latency = result["latency_ms"]
+                print(
+                    f"{name:<24} c={concurrency:<4} {result['throughput_rps']:8.1f} req/s  "
+                    f"p50={latency['p50']:8.1f}ms p95={latency['p95']:8.1f}ms p99={latency['p99']:8.1f}ms  "
+                    f"errors={result['errors']}"
+                )
+
+    report = {
+        "meta": report_metadata(kind="load_test", base_url=args.base_url, requests_per_level=args.requests),
+        "results": results,
+    }
+    print(f"Report written to {write_report(report, args.output_dir, 'load')}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8010")
+    parser.add_argument("--username", default="benchmark")
+    parser.add_argument("--password", default="Benchmark@123")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SCENARIOS),
+                        help=f"Comma-separated, from: login, auth, subscriptions, {', '.join(COUNT_SERVICES)} "
+                             "(append -lite to skip rendering)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests per scenario")
+    parser.add_argument("--image", help="Image file to submit to count endpoints (default: synthetic)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output-dir", default=os.path.join(os.path.dirname(__file__), "reports"))
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
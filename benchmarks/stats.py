@@ -0,0 +1,60 @@
+"""Shared helpers for benchmark reports."""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values, q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(q / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies) -> dict:
+    """
+    Latency summary in milliseconds for a list of durations in seconds.
+    """
+    values = sorted(latency * 1000 for latency in latencies)
+    return {
+        "min": values[0] if values else 0.0,
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def report_metadata(**extra) -> dict:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def write_report(report: dict, directory: str, prefix: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, f"{prefix}-{report['meta']['commit']}-{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
@@ -2,16 +2,30 @@
 import sys
 import os
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 # module imports
-from api.routes import users, auth, password_reset, NonTelescopicPipe, telescopic, mildSteelBars, dataManipulation, userProfile, testserv,workorder,metalSquarePipe,woodLogs
+from api.routes import health, metrics, profiling, users, auth, password_reset, count, dataManipulation, userProfile, testserv,workorder,renders,rois
 from api.routes.subscription import plan, webhook, subscribe, invoice
+from api.core.db import connect_db, close_db
+from api.core.system_logger import RequestStatsMiddleware, start_system_logger, stop_system_logger
+from api.core.tracing import TracingMiddleware
+from api.core.idempotency import IdempotencyMiddleware
+from api.core.profiler import RouteAttributionMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_system_logger()
+    await connect_db()
+    yield
+    close_db()
+    stop_system_logger()
 
 # initialize an app
-app = FastAPI(title="Alluvium AI Services Platform", version="1.0.0")
+app = FastAPI(title="Alluvium AI Services Platform", version="1.0.0", lifespan=lifespan)
 
 # Handle CORS protection
 origins = ["*"]
@@ -24,6 +38,18 @@ app.add_middleware(
     allow_headers=["*","Authorization", "Content-Type"],
 )
 
+# Replay stored responses for retried requests carrying an Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
+# Trace id, per-request span timing (Server-Timing header) and sampled trace export
+app.add_middleware(TracingMiddleware)
+
+# Request counts, latencies and in-flight requests for the request log and /health/requests
+app.add_middleware(RequestStatsMiddleware)
+
+# Tags requests with their route while a CPU profile runs, for /admin/profiling/cpu
+app.add_middleware(RouteAttributionMiddleware)
+
 # Construct the path for the static directory
 current_file_dir = os.path.dirname(os.path.abspath(__file__))
 static_dir = os.path.join(current_file_dir, "static")  # This points to the "static" directory in the project root
@@ -32,6 +58,9 @@ static_dir = os.path.join(current_file_dir, "static")  # This points to the "sta
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # Register all the router endpoints
+app.include_router(health.router)
+app.include_router(metrics.router)
+app.include_router(profiling.router)
 app.include_router(users.router)
 app.include_router(userProfile.router)
 app.include_router(auth.router)
@@ -39,11 +68,9 @@ app.include_router(password_reset.router)
 
 
 ################Services################
-app.include_router(NonTelescopicPipe.router)
-app.include_router(telescopic.router)
-app.include_router(mildSteelBars.router)
-app.include_router(metalSquarePipe.router)
-app.include_router(woodLogs.router)
+app.include_router(count.router)
+app.include_router(renders.router)
+app.include_router(rois.router)
 
 app.include_router(testserv.router)
 app.include_router(workorder.router)
@@ -0,0 +1,15 @@
+import os
+
+# api.config requires these; tests never reach the services they configure
+for name in (
+    "DB_NAME", "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_DEFAULT_REGION",
+    "S3_BUCKET_NAME", "SECRET_KEY", "RAZORPAY_API_KEY", "RAZORPAY_SECRET_KEY", "TEST_RAZORPAY_API_KEY",
+    "TEST_RAZORPAY_SECRET_KEY", "RAZORPAY_WEBHOOK_SECRET", "MAIL_USERNAME", "MAIL_PASSWORD",
+    "MAIL_FROM", "MAIL_SERVER", "MAIL_FROM_NAME",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("RAZORPAY_TEST_MODE", "true")
+os.environ.setdefault("MAIL_PORT", "587")
+os.environ.setdefault("MAIL_STARTTLS", "true")
+os.environ.setdefault("MAIL_SSL_TLS", "false")
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+
+from ultralytics.utils import ops  # noqa: E402
+
+from api.services.segmentation import BoxOnlySegmentationPredictor  # noqa: E402
+
+NUM_ANCHORS = 100
+NUM_MASK_COEFFICIENTS = 32
+
+
+def make_predictor(conf=0.25):
+    predictor = BoxOnlySegmentationPredictor.__new__(BoxOnlySegmentationPredictor)
+    predictor.args = SimpleNamespace(conf=conf, iou=0.7, agnostic_nms=False, max_det=1, classes=None)
+    predictor.model = SimpleNamespace(names={0: "pipe"})
+    predictor.batch = (["image.jpg"],)
+    return predictor
+
+
+def segment_head_output(best_anchor, best_score):
+    """
+    A raw segment head output for one 640x640 image with one class, and its mask prototypes.
+    """
+    output = torch.zeros((1, 4 + 1 + NUM_MASK_COEFFICIENTS, NUM_ANCHORS))
+    output[0, :4] = torch.tensor([100.0, 100.0, 20.0, 20.0])[:, None]
+    output[0, 4] = 0.1
+    output[0, :4, best_anchor] = torch.tensor([320.0, 240.0, 200.0, 100.0])
+    output[0, 4, best_anchor] = best_score
+    # Large mask coefficients: a predictor reading them as class scores would pick the wrong box
+    output[0, 5:, 3] = 10.0
+    protos = torch.rand((1, NUM_MASK_COEFFICIENTS, 160, 160))
+    return output, protos
+
+
+def test_returns_best_box_without_masks(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("masks must not be computed")
+
+    for name in ("process_mask", "process_mask_native", "process_mask_upsample", "scale_masks"):
+        if hasattr(ops, name):
+            monkeypatch.setattr(ops, name, fail)
+
+    predictor = make_predictor()
+    img = torch.zeros((1, 3, 640, 640))
+    orig_img = np.zeros((640, 640, 3), np.uint8)
+
+    results = predictor.postprocess(segment_head_output(7, 0.9), img, [orig_img])
+
+    assert len(results) == 1
+    assert results[0].masks is None
+    boxes = results[0].boxes.data
+    assert boxes.shape == (1, 6)
+    assert boxes[0, :4].tolist() == pytest.approx([220.0, 190.0, 420.0, 290.0])
+    assert boxes[0, 4].item() == pytest.approx(0.9)
+    assert boxes[0, 5].item() == 0
+
+
+def test_returns_no_box_below_confidence():
+    predictor = make_predictor(conf=0.5)
+    img = torch.zeros((1, 3, 640, 640))
+    orig_img = np.zeros((640, 640, 3), np.uint8)
+
+    results = predictor.postprocess(segment_head_output(7, 0.3), img, [orig_img])
+
+    assert len(results[0].boxes) == 0
+    assert results[0].masks is None